@@ -0,0 +1,75 @@
+import asyncio
+import sys
+import time
+
+from common import ROOT, bytes_written, students, summarize
+
+sys.path.insert(0, ROOT)
+
+
+async def _timed(client, latencies, method, url, **kwargs):
+    t0 = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    latencies.append(time.perf_counter() - t0)
+    response.raise_for_status()
+
+
+async def _case(client, rows, case, requests, concurrency, cache=None):
+    """Send `requests` [(method, url, kwargs)] with at most `concurrency` in flight.
+
+    The select result cache is off unless a `cache` is given, so repeated
+    reads time the query rather than a cache hit.
+    """
+    import main
+    from cache import ResultCache
+
+    main.results = cache or ResultCache(0)
+    latencies = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(method, url, kwargs):
+        async with gate:
+            await _timed(client, latencies, method, url, **kwargs)
+
+    written_before = bytes_written()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    return summarize("api", case, rows, latencies, time.perf_counter() - started, written_before)
+
+
+async def _run(rows, ops, concurrency):
+    import httpx
+    import main
+    from cache import ResultCache
+    from db import FlatDB
+    from manager import OpenDatabase
+
+    # Serve a fresh database per run through the app's default routes
+    store = main.default_db = OpenDatabase("bench", FlatDB(f"api-{rows}.json", resident=True))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Preload through the bulk endpoint in chunks
+        data = [{"name": r["name"], "age": r["age"]} for r in students(rows)]
+        for start in range(0, rows, 10000):
+            response = await client.post("/insert/students/bulk", json=data[start:start + 10000])
+            response.raise_for_status()
+
+        new = [{"name": r["name"], "age": r["age"]} for r in students(ops, seed=1)]
+        reads = max(1, ops // 10)
+        results = [
+            await _case(client, rows, "insert", [("POST", "/insert/students", {"json": r}) for r in new], concurrency),
+            await _case(client, rows, "get_by_id", [("GET", f"/students/id/{i % rows + 1}", {}) for i in range(ops)], concurrency),
+            await _case(client, rows, "select_page", [("GET", "/select/students?limit=100", {})] * reads, concurrency),
+            await _case(client, rows, "select_page_cached", [("GET", "/select/students?limit=100", {})] * reads, concurrency,
+                        cache=ResultCache()),
+            await _case(client, rows, "update_by_id", [("PUT", f"/students/id/{i % rows + 1}", {"json": {"name": "x", "age": 20}})
+                                                        for i in range(ops)], concurrency),
+        ]
+    await store.writer.stop()
+    store.db.close()
+    return results
+
+
+def run(rows, ops, concurrency=16):
+    """HTTP throughput and latency for main.py through an in-process ASGI client."""
+    return asyncio.run(_run(rows, ops, concurrency))
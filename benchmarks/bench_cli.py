@@ -0,0 +1,35 @@
+import json
+import sys
+
+from common import CLI_DIR, measure, students
+
+sys.path.insert(0, CLI_DIR)
+import cli  # noqa: E402
+
+
+def run(rows, ops):
+    """process_command for the common statements against a `rows`-record table."""
+    cli.process_command("create database bench")
+    cli.process_command("use bench")
+    cli.process_command("make students")
+    cli.insert_records("students", students(rows))
+
+    command = cli.process_command
+    include = [(f"include students [{json.dumps(record)}]",) for record in students(ops, seed=1)]
+    queries = max(1, ops // 10)  # Full scans: keep the count low on big tables
+    cache_bytes = cli.RESULT_CACHE_BYTES
+    cli.RESULT_CACHE_BYTES = 0  # Repeated statements would otherwise time result cache hits, not queries
+    results = [
+        measure("cli", "include", rows, command, include),
+        measure("cli", "select_where", rows, command, [(f"select students where age = {20 + i % 10}",) for i in range(queries)]),
+        measure("cli", "select_order_by", rows, command, [("select students name, gpa where year = 2 order by gpa desc limit 20",)] * queries),
+        measure("cli", "select_group_by", rows, command, [("select dept, count(*), avg(gpa) from students group by dept",)] * queries),
+        measure("cli", "update", rows, command, [(f"update students set gpa = 3.0 where id = {i + 1}",) for i in range(queries)]),
+        measure("cli", "exclude", rows, command, [(f"exclude from students where id = {i + 1}",) for i in range(queries)]),
+    ]
+    cli.RESULT_CACHE_BYTES = cache_bytes
+    results.append(measure("cli", "select_group_by_cached", rows, command,
+                           [("select dept, count(*), avg(gpa) from students group by dept",)] * queries))
+    cli.process_command("exit bench")
+    cli.process_command("remove bench")
+    return results
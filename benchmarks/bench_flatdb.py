@@ -0,0 +1,31 @@
+import json
+import os
+import sys
+
+from common import ROOT, measure, students
+
+sys.path.insert(0, ROOT)
+from db import FlatDB  # noqa: E402
+
+
+def run(rows, ops):
+    """FlatDB insert/get_all/update/delete on a table preloaded with `rows` records."""
+    results = []
+    for label, options in (("flatdb", {}), ("flatdb-resident", {"resident": True}), ("flatdb-log", {"log": True})):
+        if os.path.exists("storage.json.log"):
+            os.remove("storage.json.log")
+        with open("storage.json", "w") as f:
+            records = students(rows)
+            for i, record in enumerate(records, 1):
+                record["id"] = i
+            json.dump({"students": records, "__meta__": {"auto_increment": {"students": rows}}}, f)
+        db = FlatDB("storage.json", **options)
+        new = students(ops, seed=1)
+
+        results.append(measure(label, "insert", rows, db.insert, [("students", record) for record in new]))
+        results.append(measure(label, "get_all", rows, db.get_all, [("students",)] * max(1, ops // 10)))
+        results.append(measure(label, "update", rows, db.update,
+                               [("students", i % rows, {"name": "x", "age": i % 50}) for i in range(ops)]))
+        results.append(measure(label, "delete", rows, db.delete, [("students", i) for i in range(min(ops, rows))]))
+        db.close()
+    return results
@@ -0,0 +1,80 @@
+import os
+import random
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI_DIR = os.path.join(ROOT, "student-management")
+
+FIRST_NAMES = ["Ana", "Ben", "Chen", "Dara", "Eli", "Fatima", "Goran", "Hana", "Ivan", "Jia", "Kofi", "Lena"]
+DEPARTMENTS = ["cs", "ee", "me", "math", "bio", "chem"]
+
+
+def students(n, seed=0):
+    """n synthetic student records with a mix of string, int and float fields."""
+    rng = random.Random(seed)
+    return [
+        {
+            "name": f"{rng.choice(FIRST_NAMES)} {i}",
+            "age": rng.randint(17, 35),
+            "dept": rng.choice(DEPARTMENTS),
+            "gpa": round(rng.uniform(2.0, 4.0), 2),
+            "year": rng.randint(1, 5),
+        }
+        for i in range(n)
+    ]
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KiB
+
+
+def bytes_written():
+    """Bytes this process has passed to write() so far (Linux /proc), or None where unavailable."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(suite, case, rows, latencies, elapsed, written_before):
+    latencies = sorted(latencies)
+    written_after = bytes_written()
+    written = None if written_before is None or written_after is None else written_after - written_before
+    ops = len(latencies)
+    return {
+        "suite": suite,
+        "case": case,
+        "rows": rows,
+        "ops": ops,
+        "ops_per_sec": ops / elapsed if elapsed else None,
+        "p50_ms": percentile(latencies, 0.50) * 1000 if ops else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if ops else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "bytes_written_per_op": written / ops if written is not None and ops else None,
+    }
+
+
+def measure(suite, case, rows, fn, args_list):
+    """Call fn(*args) once per entry in args_list, timing each call."""
+    latencies = []
+    written_before = bytes_written()
+    started = time.perf_counter()
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(suite, case, rows, latencies, time.perf_counter() - started, written_before)
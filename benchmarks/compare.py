@@ -0,0 +1,41 @@
+"""Compare two benchmark reports: python benchmarks/compare.py old.json new.json [--threshold 0.1]"""
+import argparse
+import json
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report, {(r["suite"], r["case"], r["rows"]): r for r in report["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="flag ops/sec changes larger than this fraction")
+    args = parser.parse_args()
+
+    old_report, old = load(args.old)
+    new_report, new = load(args.new)
+    print(f"{old_report.get('commit')} -> {new_report.get('commit')}")
+    print(f"{'suite':<16} {'case':<16} {'rows':>8} {'old ops/s':>12} {'new ops/s':>12} {'change':>8} {'new p99 ms':>11}")
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key]["ops_per_sec"], new[key]["ops_per_sec"]
+        if not before or not after:
+            continue
+        change = after / before - 1
+        flag = ""
+        if change < -args.threshold:
+            flag = "  slower"
+            regressions += 1
+        elif change > args.threshold:
+            flag = "  faster"
+        p99 = new[key]["p99_ms"]
+        print(f"{key[0]:<16} {key[1]:<16} {key[2]:>8} {before:>12.1f} {after:>12.1f} {change:>+8.1%} {p99:>11.3f}{flag}")
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark FlatDB, the CLI interpreter and the HTTP API on synthetic student tables.
+
+    python benchmarks/run.py --sizes 1000,10000,100000 --out results.json
+    python benchmarks/compare.py old.json results.json
+
+Each (suite, size) runs in its own process and scratch directory, so peak
+RSS is that run's alone. Results are JSON: one entry per (suite, case,
+rows) with ops/sec, p50/p99 latency, peak RSS and bytes written per
+operation.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT
+
+SUITES = {"flatdb": "bench_flatdb", "cli": "bench_cli", "api": "bench_api"}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_one(suite, rows, ops, concurrency):
+    """Results of one suite at one table size, run in a scratch directory."""
+    module = importlib.import_module(SUITES[suite])
+    start_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f"bench-{suite}-") as scratch:
+        os.chdir(scratch)
+        try:
+            if suite == "api":
+                return module.run(rows, ops, concurrency)
+            return module.run(rows, ops)
+        finally:
+            os.chdir(start_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000", help="comma-separated table sizes, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--ops", type=int, default=1000, help="operations per write case (full scans run a tenth as many)")
+    parser.add_argument("--suites", default=",".join(SUITES), help="comma-separated subset of: " + ", ".join(SUITES))
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight for the api suite")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)  # Set for the per-size child processes
+    args = parser.parse_args()
+
+    if args.single:
+        # Child process: one suite at one size, its result list written to --out
+        with open(args.out, "w") as f:
+            json.dump(run_one(args.suites, int(args.sizes), args.ops, args.concurrency), f)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-") as parts:
+        for suite in args.suites.split(","):
+            for rows in args.sizes.split(","):
+                print(f"{suite}: {rows} rows", file=sys.stderr)
+                part = os.path.join(parts, f"{suite}-{rows}.json")
+                subprocess.run([sys.executable, os.path.abspath(__file__), "--single", "--suites", suite, "--sizes", rows,
+                                "--ops", str(args.ops), "--concurrency", str(args.concurrency), "--out", part], check=True)
+                with open(part) as f:
+                    results.extend(json.load(f))
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import threading
+from collections import OrderedDict
+
+RESULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class ResultCache:
+    """LRU of serialized read results, each stored with the table version it was computed at.
+
+    A lookup with any other version misses, so a write to the table
+    invalidates its cached results without anyone having to find them. The
+    total size of the stored bodies is kept under `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()  # key -> (version, body), most recent last
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[key] = (version, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
@@ -1,41 +1,652 @@
+import atexit
 import json
 import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from files import SEGMENTS_KEY, file_stamp, replacing, segment_dir, segment_path
+
+try:
+    import fcntl
+except ImportError:  # No advisory locks (Windows): shared mode is unavailable
+    fcntl = None
 
 DB_FILE = "storage.json"
 
+LOG_COMPACT_BYTES = 4 * 1024 * 1024
+# Reserved top-level key holding per-table auto_increment counters
+META_KEY = "__meta__"
+# Header of a shared database's lock file: the version bumped by every committed write
+VERSION = struct.Struct("<Q")
+# Top-level keys FlatDB keeps for itself, so they can't be table names
+RESERVED_TABLES = (META_KEY, SEGMENTS_KEY)
+
+def check_table(table):
+    if table in RESERVED_TABLES:
+        raise ValueError(f"'{table}' is reserved and can't be used as a table name")
+
+def _counters(data):
+    return data.setdefault(META_KEY, {}).setdefault("auto_increment", {})
+
 class FlatDB:
-    def __init__(self):
-        if not os.path.exists(DB_FILE):
-            with open(DB_FILE, "w") as f:
-                json.dump({}, f)
+    def __init__(self, path=DB_FILE, resident=False, flush_every=1, flush_interval_ms=None,
+                 log=False, compact_bytes=LOG_COMPACT_BYTES, fsync=False, observer=None, segments=False,
+                 shared=False):
+        """Open the JSON file at `path`.
+
+        With `resident=True` the parsed data stays in memory and reads never
+        touch the file. Mutations mark their table dirty and are flushed
+        every `flush_every` mutations, or every `flush_interval_ms` ms when
+        an interval is given. The cache is reloaded when another process
+        changes the file (detected by mtime).
+
+        With `log=True` (implies resident) every mutation is appended as one
+        JSON line to `<path>.log` instead of rewriting the file. `path` holds
+        the last snapshot; once the log grows past `compact_bytes` a
+        background thread writes a new snapshot and truncates the log.
+
+        With `segments=True` (implies resident) each table lives in its own
+        file under `<path>.segments/` and `path` is a small manifest, so a
+        flush rewrites only the tables changed since the last one. An
+        existing single-file database is converted on its first flush.
+
+        Every file is replaced atomically (temp file, fsync, os.replace), so
+        a crash mid-save leaves the previous version intact.
+
+        With `shared=True` several processes (e.g. uvicorn workers) can use
+        the same database. `<path>.lock` is locked with fcntl.flock: shared
+        while reading the files, exclusive around every mutation or batch(),
+        which first catches up with other processes' writes and ends with a
+        flush. Its header holds a version counter bumped by each write, so a
+        resident cache checks staleness with one 8-byte read and reloads
+        only when another process has written. flush_every and
+        flush_interval_ms are ignored, and the log layout can't be shared.
+
+        Every inserted record gets an auto-increment "id". Deleted rows are
+        left as null tombstones so positions never shift; vacuum() drops them.
+
+        `observer` (see metrics.FlatDBMetrics) is told about every file read
+        and write and every resident cache lookup; without one, each hook
+        costs a single attribute check.
+
+        table_version() names the current state of a table for result
+        caches and HTTP ETags: it changes with every write to the table and
+        every reload from disk. In shared mode it is the lock file's version,
+        the same in every process, so it changes with any committed write.
+        """
+        self.path = path
+        self.log_path = path + ".log"
+        self.log = log
+        self.segments = segments
+        self.segment_dir = segment_dir(path)
+        if log and segments:
+            raise ValueError("log and segments are separate storage layouts; pick one")
+        if shared and (log or fcntl is None):
+            raise ValueError("shared mode needs fcntl locks and the snapshot or segments layout")
+        self.shared = shared
+        self.lock_path = path + ".lock"
+        self.resident = resident or log or segments
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+        self.flush_every = flush_every
+        self.flush_interval_ms = flush_interval_ms
+        self._data = None
+        self._dirty = set()
+        self._pending = 0
+        self._stamp = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._flusher = None
+        self._log_file = None
+        self._log_generation = None  # Generation of the open log (log mode)
+        self._compacting = False
+        self._ids = {}  # table -> {id: slot}, resident mode only
+        self._batching = 0
+        self.observer = observer
+        self._version = None  # Lock file version the resident data was loaded at (shared mode)
+        self._holder = None  # Thread holding the exclusive file lock (shared mode)
+        self._token = os.urandom(4).hex()  # Keeps versions from different opens (and processes) apart
+        self._generation = 0  # Loads from disk so far
+        self._versions = {}  # table -> writes so far
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT) if shared else None
+        if shared:
+            # Names this database's lock file the same way in every process, so versions of two databases never match
+            st = os.fstat(self._lock_fd)
+            self._lock_id = f"{st.st_dev:x}-{st.st_ino:x}"
+
+        with self._writing():
+            if not os.path.exists(self.path):
+                with open(self.path, "w") as f:
+                    json.dump({}, f)
+
+        if self.log:
+            self._open_log()
+        elif self.resident:
+            if self.flush_interval_ms and not self.shared:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+            atexit.register(self.close)
+
+    def _disk_version(self):
+        header = os.pread(self._lock_fd, VERSION.size, 0)
+        return VERSION.unpack(header)[0] if len(header) == VERSION.size else 0
+
+    def _fresh(self):
+        """Whether the resident data still matches what is on disk."""
+        if self.shared:
+            return self._disk_version() == self._version
+        return file_stamp(self.path) == self._stamp
+
+    @contextmanager
+    def _reading(self):
+        """Shared file lock while the database's files are read (shared mode only)."""
+        if not self.shared or self._holder == threading.get_ident():
+            yield
+            return
+        # A separate open file, so this can never convert a writer thread's exclusive lock
+        with open(self.lock_path, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            yield
+
+    @contextmanager
+    def _writing(self):
+        """Hold the thread lock and, in shared mode, the exclusive file lock.
+
+        The outermost holder first reloads whatever other processes wrote and
+        flushes its own changes before letting go, so writes never overlap.
+        """
+        with self._lock:
+            if not self.shared or self._holder is not None:
+                yield
+                return
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            self._holder = threading.get_ident()
+            try:
+                if self._data is not None:
+                    self._cached()
+                yield
+                self.flush()
+            finally:
+                self._holder = None
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _published(self):
+        """Tell other processes the files changed (shared mode, under the exclusive lock)."""
+        if self.shared:
+            self._version = self._disk_version() + 1
+            os.pwrite(self._lock_fd, VERSION.pack(self._version), 0)
+
+    def _read_file(self):
+        started = time.perf_counter()
+        with open(self.path, "r") as f:
+            data = json.load(f)
+            size = f.tell()
+        if self.observer is not None:
+            self.observer.read(time.perf_counter() - started, size)
+        return data
+
+    def _write_file(self, path, data, **options):
+        """Atomically replace `path` with `data` as JSON: the old file stays whole until the new one is on disk."""
+        started = time.perf_counter()
+        with replacing(path) as f:
+            json.dump(data, f, **options)
+            size = f.tell()
+        if self.observer is not None:
+            self.observer.write(time.perf_counter() - started, size)
+
+    def _segment_path(self, table):
+        return segment_path(self.path, table)
+
+    def _load(self):
+        with self._reading():
+            if self.shared:
+                self._version = self._disk_version()
+            return self._load_files()
+
+    def _load_files(self):
+        self._generation += 1
+        data = self._read_file()
+        self._stamp = file_stamp(self.path)
+        if self.segments:
+            if SEGMENTS_KEY not in data:
+                self._dirty.update(data)  # Single-file layout: split it up on the next flush
+                return data
+            tables = data.pop(SEGMENTS_KEY)
+            counters = _counters(data)
+            for table in tables:
+                started = time.perf_counter()
+                with open(self._segment_path(table), "r") as f:
+                    segment = json.load(f)
+                    size = f.tell()
+                if self.observer is not None:
+                    self.observer.read(time.perf_counter() - started, size)
+                data[table] = segment["rows"]
+                # The segment is written before the manifest, so its counter may be the newer one
+                counters[table] = max(counters.get(table, 0), segment["auto_increment"])
+        return data
+
+    def _write_segments(self):
+        """Rewrite the dirty tables' segment files, then the manifest that lists them."""
+        os.makedirs(self.segment_dir, exist_ok=True)
+        counters = _counters(self._data)
+        tables = [table for table in self._data if table != META_KEY]
+        for table in self._dirty:
+            if table in self._data and table != META_KEY:
+                segment = {"auto_increment": counters.get(table, 0), "rows": self._data[table]}
+                self._write_file(self._segment_path(table), segment, separators=(",", ":"))
+        self._write_file(self.path, {SEGMENTS_KEY: tables, META_KEY: self._data.get(META_KEY, {})}, indent=4)
+        for table in self._dirty:
+            if table not in self._data and os.path.exists(self._segment_path(table)):
+                os.remove(self._segment_path(table))
+
+    def _open_log(self):
+        """Rebuild state from the snapshot plus the log tail, then reopen the log for appending.
+
+        A log's first line names its generation and a snapshot records the
+        last generation folded into it, so after a crash between writing the
+        snapshot and restarting the log, the old log isn't replayed twice.
+        """
+        data = self._load()
+        covered = data.get(META_KEY, {}).get("log_generation", -1)  # Snapshots from before generations cover no log
+        generation, good = None, 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Cut off mid-write, even if what's there parses: the next append would join it
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # Torn final record from a crash
+                    if generation is None:
+                        generation = entry["generation"] if entry["op"] == "log" else 0  # Logs from before headers
+                        if generation <= covered:
+                            break  # Already in the snapshot
+                    if entry["op"] != "log":
+                        self._apply(data, entry)
+                    good += len(line)
+        self._data = data
+        if good:
+            # Drop the torn tail so new records start on a clean line
+            with open(self.log_path, "r+b") as f:
+                f.truncate(good)
+            self._log_generation = generation
+            self._log_file = open(self.log_path, "a")
+        else:
+            self._start_log(covered + 1)
+        atexit.register(self.close)
+
+    def _start_log(self, generation):
+        """Replace the log with an empty one headed by its generation."""
+        self._log_file = open(self.log_path, "w")
+        self._log_generation = generation
+        self._log_file.write(json.dumps({"op": "log", "generation": generation}) + "\n")
+        self._sync_log()
+
+    @staticmethod
+    def _apply(data, entry):
+        op = entry["op"]
+        if op == "write":
+            data.clear()
+            data.update(entry["data"])
+            return
+        table = entry["table"]
+        rows = data.setdefault(table, [])
+        if op == "schema":
+            data.setdefault(META_KEY, {}).setdefault("schemas", {})[table] = entry["schema"]
+        elif op == "insert":
+            records = entry["records"] if "records" in entry else [entry["record"]]
+            rows.extend(records)
+            counters = _counters(data)
+            counters[table] = max([counters.get(table, 0)] + [record.get("id", 0) for record in records])
+        elif op == "update":
+            rows[entry["index"]] = entry["record"]
+        elif op == "delete":
+            rows[entry["index"]] = None
+        elif op == "vacuum":
+            data[table] = [row for row in rows if row is not None]
+
+    def _append_log(self, entry):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        self._log_file.write(line)
+        if self.observer is not None:
+            self.observer.write(0.0, len(line))  # Buffered; the sync is where the time goes
+        if not self._batching:
+            self._sync_log()
+        if not self._compacting and self._log_file.tell() >= self.compact_bytes:
+            self._compacting = True
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def _sync_log(self):
+        self._log_file.flush()
+        if self.fsync:
+            os.fsync(self._log_file.fileno())
+
+    def compact(self):
+        """Atomically write a new snapshot and start an empty log."""
+        with self._lock:
+            try:
+                self._data.setdefault(META_KEY, {})["log_generation"] = self._log_generation
+                self._write_file(self.path, self._data, separators=(",", ":"))
+                self._log_file.close()
+                self._start_log(self._log_generation + 1)
+            finally:
+                self._compacting = False
+
+    def _cached(self):
+        """Return the resident data, reloading it if the file changed on disk."""
+        if self._data is None:
+            if self.observer is not None:
+                self.observer.cache_lookup(False)
+            self._data = self._load()
+        elif not self.log and not self._fresh():
+            if self.observer is not None:
+                self.observer.cache_lookup(False)
+            fresh = self._load()
+            # Unflushed tables of ours win over the external copy
+            for table in self._dirty:
+                if table in self._data:
+                    fresh[table] = self._data[table]
+                else:
+                    fresh.pop(table, None)
+            self._data = fresh
+            self._ids.clear()
+        return self._data
 
     def read_data(self):
-        with open(DB_FILE, "r") as f:
-            return json.load(f)
+        if self.resident:
+            # Lock-free fast path: the resident dict is only ever mutated in place
+            data = self._data
+            if data is not None and (self.log or self._fresh()):
+                if self.observer is not None:
+                    self.observer.cache_lookup(True)
+                return data
+            with self._lock:
+                return self._cached()
+        with self._reading():
+            return self._read_file()
 
     def write_data(self, data):
-        with open(DB_FILE, "w") as f:
-            json.dump(data, f, indent=4)
+        self._generation += 1  # Every table may have changed
+        if self.resident:
+            with self._writing():
+                old = self._data or {}
+                if self.log:
+                    self._append_log({"op": "write", "data": data})
+                self._data = data
+                self._ids.clear()
+                self._dirty.update(data.keys())
+                self._dirty.update(old.keys())
+                self._mutated()
+            return
+        with self._writing():
+            self._write_file(self.path, data, indent=4)
+            self._published()
+
+    def _mark_dirty(self, table, data, entry=None):
+        self._versions[table] = self._versions.get(table, 0) + 1
+        if self.log:
+            self._append_log(entry)
+        elif self.resident:
+            self._dirty.add(table)
+            self._mutated()
+        else:
+            self.write_data(data)
+
+    def _mutated(self):
+        if self.log or self._batching or self.shared:  # Shared: _writing flushes on the way out
+            return
+        self._pending += 1
+        if not self.flush_interval_ms and self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Write dirty resident data back to the file."""
+        with self._lock:
+            if not self._dirty or self._data is None:
+                return
+            if self.segments:
+                self._write_segments()
+            else:
+                self._write_file(self.path, self._data, indent=4)
+            self._stamp = file_stamp(self.path)
+            self._published()
+            self._dirty.clear()
+            self._pending = 0
+
+    @contextmanager
+    def batch(self):
+        """Group mutations: nothing is flushed until the block exits, then everything is made durable at once."""
+        with self._writing():
+            self._batching += 1
+            try:
+                yield self
+            finally:
+                self._batching -= 1
+                if not self._batching:
+                    if self.log:
+                        self._sync_log()
+                    elif self.resident:
+                        self.flush()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval_ms / 1000):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        atexit.unregister(self.close)  # Don't keep a closed database alive until exit
+        if self.log:
+            with self._lock:
+                if not self._log_file.closed:
+                    self._log_file.close()
+        elif self.resident:
+            self.flush()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _id_map(self, table, data):
+        """Return {id: slot} for a table; cached while resident, rebuilt per call otherwise."""
+        ids = self._ids.get(table) if self.resident else None
+        if ids is None:
+            ids = {row["id"]: slot for slot, row in enumerate(data.get(table, [])) if row is not None and "id" in row}
+            if self.resident:
+                self._ids[table] = ids
+        return ids
+
+    def _next_id(self, data, table):
+        counters = _counters(data)
+        if table not in counters:
+            # Tables written before counters were persisted: derive it once
+            counters[table] = max((row.get("id", 0) for row in data.get(table, []) if row is not None), default=0)
+        counters[table] += 1
+        return counters[table]
 
     def insert(self, table: str, record: dict):
-        data = self.read_data()
-        if table not in data:
-            data[table] = []
-        data[table].append(record)
-        self.write_data(data)
+        """Append a record, assigning it the next id unless it carries one; returns the id."""
+        return self.insert_many(table, [record])[0]
+
+    def insert_many(self, table: str, records: list):
+        """Validate all records, then append them with a single write; returns their ids.
+
+        Raises ValueError (and inserts nothing) if any record is not a dict
+        or carries an id that is not an int or is already taken.
+        """
+        check_table(table)
+        with self._writing():
+            data = self.read_data()
+            ids = self._id_map(table, data)
+            seen = set()
+            for position, record in enumerate(records):
+                if not isinstance(record, dict):
+                    raise ValueError(f"Record {position} is not an object")
+                if "id" in record:
+                    if not isinstance(record["id"], int) or isinstance(record["id"], bool):
+                        raise ValueError(f"Record {position} has a non-integer id")
+                    if record["id"] in ids or record["id"] in seen:
+                        raise ValueError(f"Record {position} reuses id {record['id']}")
+                    seen.add(record["id"])
+
+            if table not in data:
+                data[table] = []
+            rows = data[table]
+            for record in records:
+                if "id" in record:
+                    counters = _counters(data)
+                    counters[table] = max(counters.get(table, 0), record["id"])
+                else:
+                    record["id"] = self._next_id(data, table)
+                ids[record["id"]] = len(rows)
+                rows.append(record)
+            if self.resident:
+                self._dirty.add(META_KEY)
+            if len(records) == 1:
+                entry = {"op": "insert", "table": table, "record": records[0]}
+            else:
+                entry = {"op": "insert", "table": table, "records": records}
+            self._mark_dirty(table, data, entry)
+            return [record["id"] for record in records]
+
+    def table_version(self, table: str):
+        """A string that changes whenever `table` may have changed, e.g. for an ETag."""
+        check_table(table)
+        if self.shared:
+            # The lock file's counter reads the same in every process, so workers agree on ETags
+            return f"shared-{self._lock_id}-{self._disk_version()}"
+        if self.resident:
+            self.read_data()  # Pick up other processes' writes first
+        version = f"{self._token}-{self._generation}-{self._versions.get(table, 0)}"
+        if not self.resident:
+            # Every read goes to the file, which other processes may have rewritten
+            stamp = file_stamp(self.path) or (0, 0)
+            version += f"-{stamp[0]}-{stamp[1]}"
+        return version
+
+    def set_schema(self, table: str, schema: dict):
+        """Declare a table's field types ({field: "str"|"int"|"float"|"bool"}), creating the table if needed.
+
+        FlatDB only stores the declaration; callers validate records against it.
+        """
+        check_table(table)
+        with self._writing():
+            data = self.read_data()
+            data.setdefault(table, [])
+            data.setdefault(META_KEY, {}).setdefault("schemas", {})[table] = dict(schema)
+            if self.resident:
+                self._dirty.add(META_KEY)
+            self._mark_dirty(table, data, {"op": "schema", "table": table, "schema": dict(schema)})
+
+    def schema(self, table: str):
+        """The table's declared field types, or None."""
+        check_table(table)
+        return self.read_data().get(META_KEY, {}).get("schemas", {}).get(table)
 
     def get_all(self, table: str):
+        check_table(table)
         data = self.read_data()
-        return data.get(table, [])
+        return [row for row in data.get(table, []) if row is not None]
+
+    def iter_table(self, table: str, start: int = 0, batch_size: int = 500, fields=None):
+        """Yield live records from slot `start` on, copying out one batch at a time.
+
+        No lock is held between batches, so a slow consumer doesn't block
+        writers; rows appended meanwhile are picked up. With `fields`, each
+        row is cut down to those keys as it is copied out, so wide rows are
+        never handed on whole.
+        """
+        check_table(table)
+        slot = start
+        while True:
+            batch = self.read_data().get(table, [])[slot:slot + batch_size]
+            if not batch:
+                return
+            slot += len(batch)
+            for row in batch:
+                if row is not None:
+                    yield row if fields is None else {field: row[field] for field in fields if field in row}
+
+    def cursor_slot(self, table: str, record_id: int):
+        """Slot just past the record with `record_id`, for resuming an id-ordered scan."""
+        check_table(table)
+        with self._lock:
+            data = self.read_data()
+            slot = self._id_map(table, data).get(record_id)
+            if slot is not None:
+                return slot + 1
+            # The cursor row was deleted: ids grow with slots, so bisect over live rows
+            rows = data.get(table, [])
+            lo, hi = 0, len(rows)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                probe = mid
+                while probe < hi and rows[probe] is None:
+                    probe += 1
+                if probe == hi:
+                    hi = mid
+                elif rows[probe].get("id", 0) <= record_id:
+                    lo = probe + 1
+                else:
+                    hi = mid
+            return lo
 
     def update(self, table: str, index: int, new_data: dict):
-        data = self.read_data()
-        if table in data and 0 <= index < len(data[table]):
-            data[table][index] = new_data
-            self.write_data(data)
+        check_table(table)
+        with self._writing():
+            data = self.read_data()
+            if table in data and 0 <= index < len(data[table]) and data[table][index] is not None:
+                old = data[table][index]
+                if "id" in old:
+                    new_data.setdefault("id", old["id"])
+                    ids = self._id_map(table, data)
+                    ids.pop(old["id"], None)
+                    if "id" in new_data:
+                        ids[new_data["id"]] = index
+                data[table][index] = new_data
+                self._mark_dirty(table, data, {"op": "update", "table": table, "index": index, "record": new_data})
+                return True
+            return False
 
     def delete(self, table: str, index: int):
+        """Tombstone the row at `index`; other rows keep their positions."""
+        check_table(table)
+        with self._writing():
+            data = self.read_data()
+            if table in data and 0 <= index < len(data[table]) and data[table][index] is not None:
+                old = data[table][index]
+                if "id" in old:
+                    self._id_map(table, data).pop(old["id"], None)
+                data[table][index] = None
+                self._mark_dirty(table, data, {"op": "delete", "table": table, "index": index})
+                return True
+            return False
+
+    def get(self, table: str, record_id: int):
+        check_table(table)
         data = self.read_data()
-        if table in data and 0 <= index < len(data[table]):
-            data[table].pop(index)
-            self.write_data(data)
+        slot = self._id_map(table, data).get(record_id)
+        return None if slot is None else data[table][slot]
+
+    def update_by_id(self, table: str, record_id: int, new_data: dict):
+        check_table(table)
+        with self._writing():
+            slot = self._id_map(table, self.read_data()).get(record_id)
+            return slot is not None and self.update(table, slot, new_data)
+
+    def delete_by_id(self, table: str, record_id: int):
+        check_table(table)
+        with self._writing():
+            slot = self._id_map(table, self.read_data()).get(record_id)
+            return slot is not None and self.delete(table, slot)
+
+    def vacuum(self, table: str):
+        """Drop tombstones from a table. Positions of later rows shift down."""
+        check_table(table)
+        with self._writing():
+            data = self.read_data()
+            if table in data:
+                data[table] = [row for row in data[table] if row is not None]
+                self._ids.pop(table, None)
+                self._mark_dirty(table, data, {"op": "vacuum", "table": table})
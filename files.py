@@ -0,0 +1,61 @@
+"""On-disk conventions shared by FlatDB (db.py) and the CLI: atomic file replacement and the segment layout."""
+import os
+from contextlib import contextmanager
+from urllib.parse import quote
+
+# Key of a segmented database's manifest listing its table segment files
+SEGMENTS_KEY = "__segments__"
+
+
+def file_stamp(path):
+    """(mtime, size) of `path`, or None if it doesn't exist: cheap change detection."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def fsync_dir(path):
+    """Make a rename in `path`'s directory durable (a no-op where directories can't be opened)."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def replacing(path, mode="w"):
+    """Write the new contents of `path` to the yielded file; on success it atomically replaces `path`.
+
+    The temp file is named per process, so concurrent writers never share
+    one, and is fsynced before the rename and removed if the block fails;
+    the directory is fsynced after, so the old file stays whole until the
+    new one is on disk.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    fsync_dir(path)
+
+
+def segment_dir(path):
+    return path + ".segments"
+
+
+def segment_path(path, table):
+    """File holding `table` for the segmented database whose manifest is `path`."""
+    return os.path.join(segment_dir(path), quote(table, safe="") + ".json")
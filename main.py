@@ -1,31 +1,278 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from db import FlatDB
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+from itertools import islice
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model
+from cache import ResultCache
+from db import FlatDB, check_table
+from manager import DatabaseManager, OpenDatabase
+from metrics import Counter, FlatDBMetrics, Histogram, Registry
+
+# Field names follow the CLI's schema rules (student-management/schema.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "student-management"))
+from schema import FIELD_RE  # noqa: E402
 
 app = FastAPI()
-db = FlatDB()
+router = APIRouter()
+# FLATDB_LOG=1 switches to the append-only log engine for write-heavy loads; each
+# group commit is fsynced before it is acknowledged
+use_log = os.environ.get("FLATDB_LOG") == "1"
+# FLATDB_SEGMENTS=1 stores each table in its own file, so a flush rewrites only changed tables
+use_segments = os.environ.get("FLATDB_SEGMENTS") == "1"
+# FLATDB_SHARED=1 coordinates several worker processes on the same files with fcntl locks
+use_shared = os.environ.get("FLATDB_SHARED") == "1"
+# FLATDB_METRICS=1 turns on /metrics; when off nothing is timed or counted
+registry = Registry() if os.environ.get("FLATDB_METRICS") == "1" else None
+db_metrics = FlatDBMetrics(registry) if registry else None
+db = FlatDB(resident=True, log=use_log, fsync=use_log, segments=use_segments, shared=use_shared, observer=db_metrics.bind("default") if db_metrics else None)
+# All mutations go through one writer task per database and are flushed as
+# a group; reads are served straight from the resident data
+default_db = OpenDatabase("default", db)
+writer = default_db.writer
+# /{db_name}/... routes serve databases/<db_name>/storage.json, kept open in an LRU
+manager = DatabaseManager(memory_budget=int(os.environ.get("FLATDB_MEMORY_MB", 256)) * 1024 * 1024,
+                          observer_for=db_metrics.bind if db_metrics else None, log=use_log, fsync=use_log, segments=use_segments,
+                          shared=use_shared)
+# Serialized JSON select pages, reused until their table's version changes (FLATDB_RESULT_CACHE_MB=0 turns it off)
+results = ResultCache(int(os.environ.get("FLATDB_RESULT_CACHE_MB", 64)) * 1024 * 1024)
+
+if registry:
+    request_seconds = registry.add(Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")))
+    manager_opens = registry.add(Counter("flatdb_manager_opens_total", "Named database lookups by LRU result", ("result",)))
+    result_lookups = registry.add(Counter("flatdb_result_cache_requests_total", "Select result cache lookups by result", ("result",)))
+
+    @app.middleware("http")
+    async def time_requests(request: Request, call_next):
+        started = time.perf_counter()
+        response = await call_next(request)
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        if "db_name" in request.path_params:
+            route = "/{db_name}" + route
+        request_seconds.observe(time.perf_counter() - started, request.method, route, response.status_code)
+        return response
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of request latency, file I/O and cache hit counts."""
+    if registry is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled; start the server with FLATDB_METRICS=1")
+    manager_opens.values = {("hit",): manager.hits, ("miss",): manager.misses, ("eviction",): manager.evictions}
+    result_lookups.values = {("hit",): results.hits, ("miss",): results.misses}
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("shutdown")
+async def flush_db():
+    await writer.stop()
+    db.close()
+    await manager.close()
+
+async def database(request: Request):
+    """The database a route works on: the default storage.json, or the named one for /{db_name}/... paths."""
+    try:
+        check_table(request.path_params.get("table"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    name = request.path_params.get("db_name")
+    if name is None:
+        yield default_db
+        return
+    try:
+        # Inserts create the database on first write; everything else needs it to exist
+        entry = await manager.open(name, create=request.method == "POST")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Database '{name}' does not exist")
+    entry.pins += 1
+    try:
+        yield entry
+    finally:
+        entry.pins -= 1
 
-# Pydantic model for data validation
+# Pydantic model for data validation in tables without a declared schema
 class Record(BaseModel):
     name: str
     age: int
 
-@app.post("/insert/{table}")
-def insert_record(table: str, record: Record):
-    db.insert(table, record.dict())
-    return {"message": f"Record inserted into {table}"}
+FIELD_TYPES = {"str": str, "int": int, "float": float, "bool": bool}
+
+@lru_cache(maxsize=256)
+def declared_model(fields):
+    """A Pydantic model for a declared schema ((field, type name) pairs): every field optional, no others allowed."""
+    config = ConfigDict(extra="forbid", coerce_numbers_to_str=True)
+    return create_model("DeclaredRecord", __config__=config, **{name: (Optional[FIELD_TYPES[type_name]], None) for name, type_name in fields})
+
+def validated(store, table, item):
+    """Check and convert one record against the table's declared schema, or the default Record."""
+    schema = store.db.schema(table)
+    model = declared_model(tuple(schema.items())) if schema else Record
+    try:
+        return model(**item).dict(exclude_unset=bool(schema))
+    except (TypeError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.put("/schema/{table}")
+async def set_schema(table: str, schema: dict = Body(...), store: OpenDatabase = Depends(database)):
+    """Declare field types for a table, e.g. {"name": "str", "age": "int", "email": "str"}.
+
+    Records written afterwards are validated and converted to these types;
+    rows already stored are left as they are.
+    """
+    for field, type_name in schema.items():
+        if not isinstance(type_name, str) or type_name not in FIELD_TYPES:
+            raise HTTPException(status_code=422, detail=f"Unknown type {type_name!r} for '{field}' (use {', '.join(FIELD_TYPES)})")
+        match = FIELD_RE.match(f"{field} {type_name}")
+        if not match or match.group(1) != field:
+            raise HTTPException(status_code=422, detail=f"Invalid field name '{field}' (letters, digits and _, not starting with a digit)")
+        if field.startswith(("_", "model_")) or hasattr(BaseModel, field):
+            # The declared model is a Pydantic model: these names are private or clash with its own attributes
+            raise HTTPException(status_code=422, detail=f"'{field}' can't be used as a field name")
+        if field == "id":
+            raise HTTPException(status_code=422, detail="'id' is assigned automatically")
+    await store.writer.submit(store.db.set_schema, table, schema)
+    return {"message": f"Schema for {table} declared", "schema": schema}
+
+@router.get("/schema/{table}")
+async def get_schema(table: str, store: OpenDatabase = Depends(database)):
+    schema = store.db.schema(table)
+    if schema is None:
+        raise HTTPException(status_code=404, detail=f"No schema declared for {table}")
+    return {"schema": schema}
+
+@router.post("/insert/{table}")
+async def insert_record(table: str, record: dict = Body(...), store: OpenDatabase = Depends(database)):
+    record_id = await store.writer.submit(store.db.insert, table, validated(store, table, record))
+    return {"message": f"Record inserted into {table}", "id": record_id}
 
-@app.get("/select/{table}")
-def get_records(table: str):
-    records = db.get_all(table)
-    return {"records": records}
+@router.post("/insert/{table}/bulk")
+async def insert_records(table: str, request: Request, store: OpenDatabase = Depends(database)):
+    """Insert a JSON array (or an NDJSON body) of records with one FlatDB write."""
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            payload = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            payload = json.loads(body)
+        if not isinstance(payload, list):
+            raise HTTPException(status_code=422, detail="Expected a JSON array of records")
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    records = [validated(store, table, item) for item in payload]
 
-@app.put("/update/{table}/{index}")
-def update_record(table: str, index: int, record: Record):
-    db.update(table, index, record.dict())
+    started = time.perf_counter()
+    try:
+        ids = await store.writer.submit(store.db.insert_many, table, records)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    elapsed = time.perf_counter() - started
+    return {
+        "message": f"{len(ids)} records inserted into {table}",
+        "ids": ids,
+        "seconds": elapsed,
+        "records_per_second": len(ids) / elapsed if elapsed else None,
+    }
+
+@router.get("/select/{table}")
+async def get_records(table: str, request: Request, limit: Optional[int] = Query(None, ge=1), cursor: Optional[int] = Query(None, ge=0),
+                      format: str = "json", fields: Optional[str] = None, store: OpenDatabase = Depends(database)):
+    """Return a table, optionally paged by id (`limit` + `cursor` = last id seen).
+
+    `format=ndjson` (or `Accept: application/x-ndjson`) streams one record
+    per line straight from FlatDB.iter_table, so memory stays flat.
+    `fields=name,age` returns only those keys, cut out as rows are read.
+
+    The ETag is the table's version: `If-None-Match` with it gets a 304, and
+    JSON bodies are served from the result cache until the table changes.
+    """
+    etag = f'"{store.db.table_version(table)}"'
+    if not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    streaming = format == "ndjson" or "application/x-ndjson" in request.headers.get("accept", "")
+    key = (store.db.path, table, limit, cursor, fields)  # The path: the default and a named "default" share a name
+    body = None if streaming else results.get(key, etag)
+    if body is not None:
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+    wanted = [field for field in fields.split(",") if field] if fields else None
+    # A JSON page needs each row's id for next_cursor even when it wasn't asked for
+    carry_id = wanted is not None and limit is not None and not streaming and "id" not in wanted
+    start = store.db.cursor_slot(table, cursor) if cursor is not None else 0
+    records = store.db.iter_table(table, start=start, fields=wanted + ["id"] if carry_id else wanted)
+    if limit is not None:
+        records = islice(records, limit)
+
+    if streaming:
+        lines = (json.dumps(record) + "\n" for record in records)
+        return StreamingResponse(lines, media_type="application/x-ndjson", headers={"ETag": etag})
+
+    if limit is None and cursor is None:
+        content = {"records": list(records)}
+    else:
+        page = list(records)
+        next_cursor = page[-1].get("id") if limit is not None and len(page) == limit else None
+        if carry_id:
+            for record in page:
+                record.pop("id", None)
+        content = {"records": page, "next_cursor": next_cursor}
+    # Same encoding as FastAPI's JSONResponse
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    results.put(key, etag, body)
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+def not_modified(request, etag):
+    """Whether the client's If-None-Match already names this ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in tags or "*" in tags
+
+@router.put("/update/{table}/{index}")
+async def update_record(table: str, index: int, record: dict = Body(...), store: OpenDatabase = Depends(database)):
+    """Replace the record in storage slot `index`.
+
+    Slots are positions in the stored table, deleted rows included, so after a
+    delete they no longer match positions in /select; prefer /{table}/id/{id}.
+    """
+    if not await store.writer.submit(store.db.update, table, index, validated(store, table, record)):
+        raise HTTPException(status_code=404, detail=f"No record in slot {index} of {table}")
     return {"message": f"Record in {table} updated at index {index}"}
 
-@app.delete("/delete/{table}/{index}")
-def delete_record(table: str, index: int):
-    db.delete(table, index)
+@router.delete("/delete/{table}/{index}")
+async def delete_record(table: str, index: int, store: OpenDatabase = Depends(database)):
+    """Delete the record in storage slot `index` (see update_record); the slot stays empty until a vacuum."""
+    if not await store.writer.submit(store.db.delete, table, index):
+        raise HTTPException(status_code=404, detail=f"No record in slot {index} of {table}")
     return {"message": f"Record deleted from {table} at index {index}"}
+
+@router.get("/{table}/id/{record_id}")
+async def get_record_by_id(table: str, record_id: int, store: OpenDatabase = Depends(database)):
+    record = store.db.get(table, record_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"No record with id {record_id} in {table}")
+    return {"record": record}
+
+@router.put("/{table}/id/{record_id}")
+async def update_record_by_id(table: str, record_id: int, record: dict = Body(...), store: OpenDatabase = Depends(database)):
+    if not await store.writer.submit(store.db.update_by_id, table, record_id, validated(store, table, record)):
+        raise HTTPException(status_code=404, detail=f"No record with id {record_id} in {table}")
+    return {"message": f"Record {record_id} in {table} updated"}
+
+@router.delete("/{table}/id/{record_id}")
+async def delete_record_by_id(table: str, record_id: int, store: OpenDatabase = Depends(database)):
+    if not await store.writer.submit(store.db.delete_by_id, table, record_id):
+        raise HTTPException(status_code=404, detail=f"No record with id {record_id} in {table}")
+    return {"message": f"Record {record_id} deleted from {table}"}
+
+@app.get("/databases")
+async def list_databases():
+    return {"databases": manager.names()}
+
+# Every route is served for the default database and, under a /{db_name} prefix, for named ones
+app.include_router(router)
+app.include_router(router, prefix="/{db_name}")
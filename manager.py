@@ -0,0 +1,103 @@
+import asyncio
+import os
+import re
+from collections import OrderedDict
+
+from db import DB_FILE, FlatDB
+from writer import GroupCommitWriter
+
+DB_ROOT = "databases"
+MEMORY_BUDGET_BYTES = 256 * 1024 * 1024
+NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class OpenDatabase:
+    def __init__(self, name, db):
+        self.name = name
+        self.db = db
+        self.writer = GroupCommitWriter(db)
+        self.pins = 0  # Requests currently using it; pinned databases are never evicted
+
+    def footprint(self):
+        """Resident size estimate: the snapshot plus any log waiting to be compacted, or its table segments."""
+        paths = [self.db.path, self.db.log_path]
+        if os.path.isdir(self.db.segment_dir):
+            paths += [os.path.join(self.db.segment_dir, name) for name in os.listdir(self.db.segment_dir)]
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+
+class DatabaseManager:
+    """Serves the databases under `root/<name>/storage.json` from one process.
+
+    Opened databases stay resident (each with its own group-commit writer)
+    in an LRU. When the estimated total passes `memory_budget` bytes, the
+    least recently used ones are closed: their queued writes are drained
+    and dirty tables flushed first, so eviction never loses data.
+    """
+
+    def __init__(self, root=DB_ROOT, memory_budget=MEMORY_BUDGET_BYTES, observer_for=None, **options):
+        self.root = root
+        self.memory_budget = memory_budget
+        self.observer_for = observer_for  # name -> FlatDB observer, for per-database metrics
+        self.options = options  # Passed to every FlatDB (log, flush_every, ...)
+        self.hits = self.misses = self.evictions = 0
+        self._open = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    def path(self, name):
+        if not NAME_RE.match(name):
+            raise ValueError(f"Invalid database name '{name}'")
+        return os.path.join(self.root, name, DB_FILE)
+
+    def exists(self, name):
+        return name in self._open or os.path.exists(self.path(name))
+
+    def names(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.exists(os.path.join(self.root, name, DB_FILE)))
+
+    async def open(self, name, create=False):
+        """The resident OpenDatabase for `name`; KeyError if it doesn't exist and `create` is false."""
+        entry = self._open.get(name)
+        if entry is not None:
+            self.hits += 1
+            self._open.move_to_end(name)
+            return entry
+        self.misses += 1
+        async with self._lock:
+            entry = self._open.get(name)
+            if entry is None:
+                path = self.path(name)
+                if not os.path.exists(path):
+                    if not create:
+                        raise KeyError(name)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                observer = self.observer_for(name) if self.observer_for else None
+                entry = OpenDatabase(name, FlatDB(path, resident=True, observer=observer, **self.options))
+                self._open[name] = entry
+            self._open.move_to_end(name)
+            await self._evict(keep=name)
+        return entry
+
+    async def _evict(self, keep):
+        sizes = {name: entry.footprint() for name, entry in self._open.items()}
+        total = sum(sizes.values())
+        for name in list(self._open):
+            if total <= self.memory_budget:
+                break
+            entry = self._open.get(name)
+            if entry is not None and name != keep and not entry.pins:
+                self.evictions += 1
+                await self.close_one(name)
+                total -= sizes[name]
+
+    async def close_one(self, name):
+        entry = self._open.pop(name, None)
+        if entry is not None:
+            await entry.writer.stop()
+            entry.db.close()
+
+    async def close(self):
+        for name in list(self._open):
+            await self.close_one(name)
@@ -0,0 +1,107 @@
+"""Prometheus text-format metrics for the API and FlatDB, with no client library needed."""
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = buckets
+        self.series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 2)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                bucket_labels = _labels(self.label_names + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class FlatDBMetrics:
+    """Observer for FlatDB (its `observer` argument): file I/O and resident cache counters, per database."""
+
+    def __init__(self, registry):
+        self.bytes_read = registry.add(Counter("flatdb_bytes_read_total", "Bytes parsed from database files", ("db",)))
+        self.bytes_written = registry.add(Counter("flatdb_bytes_written_total", "Bytes written to database and log files", ("db",)))
+        self.io_seconds = registry.add(Histogram("flatdb_io_seconds", "Time spent reading or writing a database file", ("db", "op")))
+        self.cache = registry.add(Counter("flatdb_cache_requests_total", "Resident cache lookups by result", ("db", "result")))
+
+    def bind(self, name):
+        return _BoundObserver(self, name)
+
+
+class _BoundObserver:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def read(self, seconds, size):
+        self.metrics.bytes_read.inc(self.name, amount=size)
+        self.metrics.io_seconds.observe(seconds, self.name, "read")
+
+    def write(self, seconds, size):
+        self.metrics.bytes_written.inc(self.name, amount=size)
+        self.metrics.io_seconds.observe(seconds, self.name, "write")
+
+    def cache_lookup(self, hit):
+        self.metrics.cache.inc(self.name, "hit" if hit else "miss")
@@ -0,0 +1,105 @@
+from indexes import hash_key, sort_key
+
+FUNCTIONS = ("count", "sum", "avg", "min", "max")
+
+
+class Aggregate:
+    """One aggregate column such as count(*) or avg(age).
+
+    State per group is a small list updated in place, so a GROUP BY only
+    ever holds one accumulator per (group, aggregate) and never the rows.
+    """
+
+    def __init__(self, func, field):
+        self.func = func
+        self.field = field  # "*" only for count(*)
+        self.label = f"{func}({field})"
+
+    def start(self):
+        if self.func in ("count", "sum"):
+            return [0]
+        if self.func == "avg":
+            return [0, 0]  # total, count
+        return [None]
+
+    def add(self, state, record):
+        if self.field == "*":
+            state[0] += 1
+            return
+        value = record.get(self.field)
+        if value is None:
+            return
+        if self.func == "count":
+            state[0] += 1
+        elif self.func in ("sum", "avg"):
+            # Only numbers take part, as in SQL's implicit numeric context
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                state[0] += value
+                if self.func == "avg":
+                    state[1] += 1
+        elif state[0] is None:
+            state[0] = value
+        elif self.func == "min" and sort_key(value) < sort_key(state[0]):
+            state[0] = value
+        elif self.func == "max" and sort_key(value) > sort_key(state[0]):
+            state[0] = value
+
+    def merge(self, state, other):
+        """Fold another partial state (from a different chunk of rows) into `state`."""
+        if self.func in ("count", "sum"):
+            state[0] += other[0]
+        elif self.func == "avg":
+            state[0] += other[0]
+            state[1] += other[1]
+        elif other[0] is None:
+            return
+        elif state[0] is None:
+            state[0] = other[0]
+        elif self.func == "min" and sort_key(other[0]) < sort_key(state[0]):
+            state[0] = other[0]
+        elif self.func == "max" and sort_key(other[0]) > sort_key(state[0]):
+            state[0] = other[0]
+
+    def result(self, state):
+        if self.func == "avg":
+            return state[0] / state[1] if state[1] else None
+        return state[0]
+
+
+def accumulate(records, group_field, aggregates):
+    """Partial aggregation: {group slot: (group_key, states)} in first-appearance order."""
+    groups = {}
+    for record in records:
+        key = record.get(group_field) if group_field else None
+        slot = hash_key(key)
+        entry = groups.get(slot)
+        if entry is None:
+            entry = groups[slot] = (key, [agg.start() for agg in aggregates])
+        for agg, state in zip(aggregates, entry[1]):
+            agg.add(state, record)
+    return groups
+
+
+def merge_groups(groups, other, aggregates):
+    """Fold the partial groups of a later chunk into `groups`."""
+    for slot, (key, states) in other.items():
+        entry = groups.get(slot)
+        if entry is None:
+            groups[slot] = (key, states)
+        else:
+            for agg, state, partial in zip(aggregates, entry[1], states):
+                agg.merge(state, partial)
+    return groups
+
+
+def finish(groups, group_field, aggregates):
+    """[(group_key, [results...])] from accumulated groups."""
+    if not groups and not group_field:
+        # Aggregates over no rows still produce one row, as in SQL
+        groups[None] = (None, [agg.start() for agg in aggregates])
+    return [(key, [agg.result(state) for agg, state in zip(aggregates, states)]) for key, states in groups.values()]
+
+
+def aggregate(records, group_field, aggregates):
+    """One-pass hash aggregation: [(group_key, [results...])] in first-appearance order."""
+    return finish(accumulate(records, group_field, aggregates), group_field, aggregates)
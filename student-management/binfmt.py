@@ -0,0 +1,242 @@
+"""Binary database container used for `<db>.cdb` files.
+
+Layout::
+
+    header     magic "CDB1", directory offset, directory length (struct "<4sQQ")
+    blocks     one encoded row block per table
+    directory  compact JSON: {"meta": {...}, "tables": {name: [offset, length, rows, codec]}}
+
+The file is memory-mapped and each table's block is decoded on first
+access. Saving appends blocks only for changed tables plus a new
+directory, then repoints the header, so unchanged tables are never
+rewritten; once dead space outweighs live data the file is compacted
+through a temp file and os.replace.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+
+# files.py, with the on-disk conventions shared with FlatDB, lives one directory up
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+from files import SEGMENTS_KEY, replacing, segment_path  # noqa: E402
+
+try:
+    import msgpack
+except ImportError:  # Blocks fall back to compact JSON; the codec is recorded per block
+    msgpack = None
+
+MAGIC = b"CDB1"
+HEADER = struct.Struct("<4sQQ")
+COMPACT_MIN_BYTES = 64 * 1024
+
+_UNLOADED = object()
+
+
+def encode_rows(rows):
+    if msgpack is not None:
+        return "msgpack", msgpack.packb(rows, use_bin_type=True)
+    return "json", json.dumps(rows, separators=(",", ":")).encode("utf-8")
+
+
+def decode_rows(codec, data):
+    if codec == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("This database was written with msgpack; install msgpack to read it.")
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+class BinaryDatabase:
+    def __init__(self, path):
+        self.path = path
+        self.meta = {}
+        self.blocks = {}  # table -> [offset, length, rows, codec]
+        self._file = None
+        self._map = None
+        if not os.path.exists(path):
+            self._write_full({}, {}, {})
+        self._open()
+
+    def _open(self):
+        self.close()
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, offset, length = HEADER.unpack(self._map[:HEADER.size])
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a binary database")
+        directory = json.loads(self._map[offset:offset + length])
+        self.meta = directory["meta"]
+        self.blocks = directory["tables"]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        if self._file:
+            self._file.close()
+        self._map = self._file = None
+
+    @property
+    def table_names(self):
+        return list(self.blocks)
+
+    def read_table(self, name):
+        offset, length, _, codec = self.blocks[name]
+        return decode_rows(codec, self._map[offset:offset + length])
+
+    def raw_block(self, name):
+        offset, length, _, _ = self.blocks[name]
+        return self._map[offset:offset + length]
+
+    def save(self, tables, meta, dirty):
+        """Persist `tables` (a LazyTables or dict), re-encoding only loaded tables named in `dirty`."""
+        fresh = {}
+        for name in tables:
+            if name in self.blocks and (name not in dirty or not is_loaded(tables, name)):
+                continue
+            fresh[name] = encode_rows(tables[name])
+
+        live = sum(self.blocks[name][1] for name in tables if name in self.blocks and name not in fresh)
+        live += sum(len(data) for _, data in fresh.values())
+        dead = os.path.getsize(self.path) - HEADER.size - live
+        if dead > max(live, COMPACT_MIN_BYTES):
+            kept = {name: self.raw_block(name) for name in tables if name not in fresh}
+            self._write_full(tables, meta, fresh, kept)
+        else:
+            self._append(tables, meta, fresh)
+        self._open()
+
+    def _append(self, tables, meta, fresh):
+        with open(self.path, "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            directory = {}
+            for name in tables:
+                if name in fresh:
+                    codec, data = fresh[name]
+                    directory[name] = [f.tell(), len(data), len(tables[name]), codec]
+                    f.write(data)
+                else:
+                    directory[name] = self.blocks[name]
+            offset = f.tell()
+            encoded = json.dumps({"meta": meta, "tables": directory}, separators=(",", ":")).encode("utf-8")
+            f.write(encoded)
+            f.flush()
+            os.fsync(f.fileno())
+            # The old directory stays valid until this header write lands
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, offset, len(encoded)))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_full(self, tables, meta, fresh, kept=None):
+        kept = kept or {}
+        with replacing(self.path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, 0, 0))
+            directory = {}
+            for name in tables:
+                if name in fresh:
+                    codec, data = fresh[name]
+                    rows = len(tables[name])
+                else:
+                    data = kept[name]
+                    _, _, rows, codec = self.blocks[name]
+                directory[name] = [f.tell(), len(data), rows, codec]
+                f.write(data)
+            offset = f.tell()
+            encoded = json.dumps({"meta": meta, "tables": directory}, separators=(",", ":")).encode("utf-8")
+            f.write(encoded)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, offset, len(encoded)))
+            self.close()  # Kept blocks are copied out; unmap the old file before it is replaced
+
+
+class LazyTables(dict):
+    """Table name -> rows, decoding each table from a BinaryDatabase on first access."""
+
+    def __init__(self, source):
+        super().__init__(dict.fromkeys(source.table_names, _UNLOADED))
+        self.source = source
+
+    def __getitem__(self, name):
+        value = super().__getitem__(name)
+        if value is _UNLOADED:
+            value = self.source.read_table(name)
+            super().__setitem__(name, value)
+        return value
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def items(self):
+        return [(name, self[name]) for name in self]
+
+    def values(self):
+        return [self[name] for name in self]
+
+    def pop(self, name, *default):
+        if name in self:
+            value = self[name]
+            super().pop(name)
+            return value
+        return super().pop(name, *default)
+
+
+def is_loaded(tables, name):
+    return not isinstance(tables, LazyTables) or dict.__getitem__(tables, name) is not _UNLOADED
+
+
+def read_json_database(json_path, meta_key="__meta__"):
+    """Tables and meta of a JSON database file, including FlatDB's segmented layout and tombstones.
+
+    A segmented file only lists its tables, whose rows are read from
+    `<json_path>.segments/`; deleted rows (null) are dropped.
+    """
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    meta = data.pop(meta_key, {})
+    if SEGMENTS_KEY in data:
+        counters = meta.setdefault("auto_increment", {})
+        for name in data.pop(SEGMENTS_KEY):
+            with open(segment_path(json_path, name), "r") as f:
+                segment = json.load(f)
+            data[name] = segment["rows"]
+            counters[name] = max(counters.get(name, 0), segment["auto_increment"])
+    for name, rows in data.items():
+        if not isinstance(rows, list):
+            raise ValueError(f"'{name}' in {json_path} is not a table")
+        data[name] = [row for row in rows if row is not None]
+    return data, meta
+
+
+def json_to_binary(json_path, binary_path, meta_key="__meta__"):
+    """Import a JSON database file (e.g. databases/mydb/storage.json) into a .cdb file."""
+    data, meta = read_json_database(json_path, meta_key)
+    target = BinaryDatabase(binary_path)
+    target.save(data, meta, set(data))
+    target.close()
+
+
+def binary_to_json(binary_path, json_path, meta_key="__meta__"):
+    """Export a .cdb file back to the indented JSON layout."""
+    source = BinaryDatabase(binary_path)
+    data = {name: source.read_table(name) for name in source.table_names}
+    if source.meta:
+        data[meta_key] = source.meta
+    source.close()
+    # Atomic and fsynced: the caller may delete the .cdb as soon as this returns
+    with replacing(json_path) as f:
+        json.dump(data, f, indent=4)
+
+
+if __name__ == "__main__":
+    # python binfmt.py import databases/mydb/storage.json mydb.cdb
+    # python binfmt.py export mydb.cdb mydb.json
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        sys.exit("Usage: python binfmt.py import|export <source> <target>")
+    if sys.argv[1] == "import":
+        json_to_binary(sys.argv[2], sys.argv[3])
+    else:
+        binary_to_json(sys.argv[2], sys.argv[3])
@@ -1,38 +1,144 @@
 import os
+import sys
 import json
-import shutil
-<<<<<<< HEAD:student-management/cli.py
 import re
-import tkinter as tk
-from tkinter import filedialog
+import time
+import argparse
 import csv
-=======
-import csv
-import re
-import tkinter as tk
-from tkinter import filedialog
->>>>>>> 0590f186fd4c53521bce3156adeb3373e28045c7:cli.py
+from collections import OrderedDict
+from itertools import count, islice
+
+# files.py, with the on-disk conventions shared with FlatDB, lives one directory up
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import parallel
+import profiling
+from aggregate import aggregate, finish
+from binfmt import BinaryDatabase, LazyTables, binary_to_json, json_to_binary
+from columnar import ColumnarTable
+from files import file_stamp, replacing
+from indexes import FieldIndex, id_key, sort_key
+from profiling import phase
+from query import Compare, In, QuerySyntaxError, compile_statement, normalize
+from schema import SchemaError, casts_for, coerce_record, parse_schema
+from transfer import chunks, format_for, read_rows, write_rows, write_tables
 
 
 current_db = None
 current_db_file = None
 _id_counter = {}
+_indexes = {}  # table -> {field: FieldIndex}
+_pk = {}  # table -> {id: record}, built on first id lookup
+_columnar = {}  # table -> ColumnarTable, or None until rebuilt after a change
+_schemas = {}  # table -> {field: type name} for tables made with declared types
+_binary = None  # BinaryDatabase behind current_db when the database is a .cdb file
+_dirty = set()  # tables changed since the last save; only these are re-encoded in a .cdb
+_stamp = None  # (mtime, size) of current_db_file as of the last load or save
+_open_dbs = OrderedDict()  # db file -> state of a recently used database, most recent last
+_txn = None  # While a transaction is open: table -> what it takes to undo its changes (or _NEW), see table_backup
+_txn_meta = None  # (id counters, index fields, columnar tables) at BEGIN
+_NEW = object()
+_results = OrderedDict()  # (db file, indent, statement text) -> (table version, output), most recent last
+_result_bytes = 0
+_versions = {}  # table -> number from _version_clock, renewed by every change to it
+_version_clock = count(1)
+_json_indent = 4  # Select output layout; script mode prints one compact JSON line per statement
+
+# Recently used databases stay loaded (with their indexes) up to this much file size,
+# so switching back with `use` doesn't parse the file again
+DB_CACHE_BYTES = 64 * 1024 * 1024
+# Output of repeated select/count statements is kept (up to this many characters) until their table changes
+RESULT_CACHE_BYTES = 16 * 1024 * 1024
+READ_KINDS = ("select", "count")
+
+META_KEY = "__meta__"
+USAGE = {
+    "select": "SELECT table_name [field, ...] [WHERE condition] [GROUP BY field] [ORDER BY field ASC/DESC] [LIMIT n] [OFFSET n];",
+    "update": "UPDATE table_name SET field = value[, field = value] WHERE condition;",
+    "delete": "DELETE [field_name] FROM table_name WHERE condition;",
+    "exclude": "EXCLUDE table_name; OR EXCLUDE FROM table_name [WHERE condition];",
+    "count": "COUNT table_name [WHERE condition];",
+}
+
+def db_path_for(db_name):
+    """The database's file: the binary .cdb if there is one, else the JSON file (which may not exist yet)."""
+    binary_path = f"{db_name}.cdb"
+    return binary_path if os.path.exists(binary_path) else f"{db_name}.json"
+
+def stash_db():
+    """Park the current database in the cache of recently used ones, saving it first if needed."""
+    if current_db is None:
+        return
+    if _dirty:
+        save_db()
+    _open_dbs[current_db_file] = (current_db, _binary, _id_counter, _indexes, _pk, _columnar, _schemas, _stamp)
+    _open_dbs.move_to_end(current_db_file)
+    # Evict the least recently used beyond the budget; everything cached is already saved
+    while len(_open_dbs) > 1 and sum(state[-1][1] for state in _open_dbs.values() if state[-1]) > DB_CACHE_BYTES:
+        forget_db(next(iter(_open_dbs)))
+
+def forget_db(db_path):
+    state = _open_dbs.pop(db_path, None)
+    if state is not None and state[1] is not None:
+        state[1].close()
+
+def close_db(cache=False):
+    """Leave the current database, parking it among the recently used ones or, when it is being removed or rewritten, closing it."""
+    global current_db, current_db_file, _binary, _id_counter, _indexes, _pk, _columnar, _schemas, _dirty, _stamp
+    if cache:
+        stash_db()
+    elif _binary is not None:
+        _binary.close()
+    current_db = current_db_file = _binary = _stamp = None
+    _id_counter, _indexes, _pk, _columnar, _schemas, _dirty = {}, {}, {}, {}, {}, set()
 
 def load_db(db_name):
-    global current_db, current_db_file
-    db_path = f"{db_name}.json"  # No folder, just file
-    
-    if os.path.exists(db_path):
-        with open(db_path, "r") as f:
-            try:
-                current_db = json.load(f)
-            except json.JSONDecodeError:
-                current_db = {}
+    global current_db, current_db_file, _binary, _id_counter, _indexes, _pk, _columnar, _schemas, _dirty, _stamp
+    db_path = db_path_for(db_name)  # No folder, just file
+    if db_path == current_db_file and _stamp == file_stamp(db_path):
+        return
+    stash_db()
+
+    state = _open_dbs.pop(db_path, None)
+    if state is not None and state[-1] == file_stamp(db_path):
+        current_db, _binary, _id_counter, _indexes, _pk, _columnar, _schemas, _stamp = state
+        current_db_file = db_path
+        _dirty = set()
+        return
+    if state is not None and state[1] is not None:
+        state[1].close()  # Changed on disk since it was cached
+
+    _stamp = file_stamp(db_path)
+    if db_path.endswith(".cdb"):
+        # Tables are decoded from the memory-mapped file on first access
+        _binary = BinaryDatabase(db_path)
+        current_db = LazyTables(_binary)
+        meta = dict(_binary.meta)
     else:
-        current_db = {}
-
+        _binary = None
+        if os.path.exists(db_path):
+            with open(db_path, "r") as f:
+                try:
+                    current_db = json.load(f)
+                except json.JSONDecodeError:
+                    current_db = {}
+        else:
+            current_db = {}
+        meta = current_db.pop(META_KEY, {})
     current_db_file = db_path
-    update_id_counter() # Update the ID counter after loading the DB
+    _dirty = set()
+    _id_counter = dict(meta.get("auto_increment", {}))
+    update_id_counter() # Fill in counters for tables saved without one
+
+    _pk = {}
+    _columnar = dict.fromkeys(meta.get("columnar", []))
+    _schemas = {table: dict(schema) for table, schema in meta.get("schemas", {}).items()}
+    _indexes = {}
+    for table_name, fields in meta.get("indexes", {}).items():
+        for field in fields:
+            build_index(table_name, field)
 
 
 def update_id_counter():
@@ -40,39 +146,700 @@ def update_id_counter():
     global _id_counter
     
     if current_db is not None:
-        for table_name, records in current_db.items():
-            _id_counter[table_name] = max((record.get("id", 0) for record in records), default=0)
+        for table_name in current_db:
+            if table_name not in _id_counter:  # Only these tables need reading
+                _id_counter[table_name] = max((record.get("id", 0) for record in current_db[table_name]), default=0)
 
 def save_db():
-    """Save the database to the current database's JSON file."""
+    """Save the database to the current database's file (JSON, or only the changed tables of a .cdb).
+
+    Inside a transaction this is deferred: COMMIT writes everything once.
+    """
+    if _txn is not None:
+        return
+    with phase("save"):
+        write_db()
+
+def write_db():
+    global _stamp
     if current_db_file:
-        with open(current_db_file, "w") as f:
-            json.dump(current_db, f, indent=4)
+        meta = {"auto_increment": {table: _id_counter[table] for table in current_db if table in _id_counter}}
+        if _indexes:
+            meta["indexes"] = {table: list(fields) for table, fields in _indexes.items()}
+        if _columnar:
+            meta["columnar"] = list(_columnar)
+        if _schemas:
+            meta["schemas"] = _schemas
+        if _binary is not None:
+            _binary.save(current_db, meta, _dirty)
+        else:
+            data = dict(current_db)
+            data[META_KEY] = meta
+            with replacing(current_db_file) as f:
+                json.dump(data, f, indent=4)
+        _dirty.clear()
+        _stamp = file_stamp(current_db_file)
+
+def build_index(table_name, field):
+    """Create (or rebuild) the index on table_name.field from the current records."""
+    index = FieldIndex(field)
+    index.build(current_db.get(table_name, []))
+    _indexes.setdefault(table_name, {})[field] = index
+    return index
+
+def columnar_view(table_name):
+    """The table's column view if it uses the columnar layout, rebuilding it if stale."""
+    if table_name not in _columnar:
+        return None
+    if _columnar[table_name] is None:
+        _columnar[table_name] = ColumnarTable(current_db[table_name])
+    return _columnar[table_name]
+
+def table_changed(table_name):
+    _dirty.add(table_name)
+    _versions[table_name] = next(_version_clock)
+    parallel.release((current_db_file, table_name))  # Its workers hold the old rows
+    if table_name in _columnar:
+        _columnar[table_name] = None
+
+def table_backup(table_name):
+    """The open transaction's undo record for a table, created when the table is first changed.
+
+    Appends only need the row count at that point; records changed in place
+    are copied one by one as they change, and the row list itself is copied
+    (references only) once rows are removed or the list is replaced.
+    """
+    backup = _txn.get(table_name)
+    if backup is None:
+        if table_name in current_db:
+            rows = current_db[table_name]
+            backup = {"table": rows, "length": len(rows), "rows": None, "records": {}}
+        else:
+            backup = _NEW
+        _txn[table_name] = backup
+    return backup
+
+def before_change(table_name):
+    """Inside a transaction, keep a table's pre-transaction row list before rows are removed or the list replaced."""
+    if _txn is not None:
+        backup = table_backup(table_name)
+        if backup is not _NEW and backup["rows"] is None:
+            # Until now rows were only appended to the list, so its head is what BEGIN saw
+            backup["rows"] = backup["table"][:backup["length"]]
+
+def before_append(table_name):
+    """Inside a transaction, remember the table's row count before records are appended."""
+    if _txn is not None:
+        table_backup(table_name)
+
+def before_update(table_name, records):
+    """Inside a transaction, keep the fields of records about to be changed in place."""
+    if _txn is not None:
+        backup = table_backup(table_name)
+        if backup is not _NEW:
+            saved = backup["records"]
+            for record in records:
+                if id(record) not in saved:
+                    saved[id(record)] = (record, dict(record))
+
+def begin():
+    global _txn, _txn_meta
+    _txn = {}
+    _txn_meta = (dict(_id_counter), {table: list(fields) for table, fields in _indexes.items()}, list(_columnar), dict(_schemas))
+
+def commit():
+    global _txn, _txn_meta
+    _txn = _txn_meta = None
+    save_db()
+
+def rollback():
+    """Put back every table touched since BEGIN, along with the counters, indexes, columnar set and schemas."""
+    global _txn, _txn_meta
+    backups, (counters, index_fields, columnar, schemas) = _txn, _txn_meta
+    _txn = _txn_meta = None
+
+    for table_name, backup in backups.items():
+        if backup is _NEW:
+            current_db.pop(table_name, None)
+            continue
+        for record, fields in backup["records"].values():
+            record.clear()
+            record.update(fields)
+        if backup["rows"] is not None:
+            current_db[table_name] = backup["rows"]
+        else:
+            del backup["table"][backup["length"]:]  # Drop what was appended
+            current_db[table_name] = backup["table"]
+    _id_counter.clear()
+    _id_counter.update(counters)
+    _schemas.clear()
+    _schemas.update(schemas)
+    for table_name in list(_indexes):
+        for field in list(_indexes[table_name]):
+            if field not in index_fields.get(table_name, []):
+                del _indexes[table_name][field]
+        if not _indexes[table_name] or table_name not in current_db:
+            del _indexes[table_name]
+    _columnar.clear()
+    _columnar.update(dict.fromkeys(table_name for table_name in columnar if table_name in current_db))
+    for table_name in backups:
+        table_changed(table_name)
+        _pk.pop(table_name, None)
+        _indexes.pop(table_name, None)
+        if table_name in current_db:
+            for field in index_fields.get(table_name, []):
+                build_index(table_name, field)
+    _dirty.clear()  # Memory matches the file again
+
+def index_add(table_name, records):
+    table_changed(table_name)
+    for index in _indexes.get(table_name, {}).values():
+        for record in records:
+            index.add(record)
+    if table_name in _pk:
+        for record in records:
+            _pk[table_name][record.get("id")] = record
+
+def index_remove(table_name, records):
+    table_changed(table_name)
+    for index in _indexes.get(table_name, {}).values():
+        for record in records:
+            index.remove(record)
+    if table_name in _pk:
+        for record in records:
+            _pk[table_name].pop(record.get("id"), None)
+
+def reindex_tables(table_name):
+    """Rebuild every index on a table after its record list was replaced."""
+    table_changed(table_name)
+    _pk.pop(table_name, None)
+    for field in list(_indexes.get(table_name, {})):
+        build_index(table_name, field)
+
+def insert_records(table_name, records):
+    """Assign ids to already-validated records, append and index them, then save once."""
+    inserted_ids = append_records(table_name, records)
+    save_db()
+    return inserted_ids
+
+def append_records(table_name, records):
+    """insert_records without the save, for callers adding many batches."""
+    before_append(table_name)
+    inserted_ids = []
+    for record in records:
+        # Auto-increment ID
+        _id_counter[table_name] = _id_counter.get(table_name, 0) + 1
+        record["id"] = _id_counter[table_name]
+        inserted_ids.append(record["id"])
+
+    current_db[table_name].extend(records)
+    index_add(table_name, records)
+    return inserted_ids
+
+def pk_lookup(table_name, record_id):
+    if table_name not in _pk:
+        _pk[table_name] = {record["id"]: record for record in current_db[table_name] if "id" in record}
+    record = _pk[table_name].get(record_id)
+    return [] if record is None else [record]
+
+def index_lookup(index, literal):
+    """Records equal to a literal: its typed value, plus its written form for string fields."""
+    matches = index.lookup(literal.value)
+    if literal.text != literal.value:
+        seen = {id(record) for record in matches}
+        matches += [record for record in index.lookup(literal.text) if id(record) not in seen]
+    return matches
+
+def probe(table_name, node):
+    """Candidate records for one WHERE term from the id map or an index, or None if it needs a scan."""
+    lookup = probe_plan(table_name, node)
+    return None if lookup is None else lookup()
+
+def probe_plan(table_name, node):
+    """How probe would answer one WHERE term: a function returning the candidates, or None for a scan."""
+    if not isinstance(node, (Compare, In)):
+        return None
+    index = _indexes.get(table_name, {}).get(node.field)
+    if isinstance(node, In):
+        if node.negated:
+            return None
+        if node.field == "id" and all(isinstance(literal.value, int) for literal in node.literals):
+            return lambda: [record for literal in node.literals for record in pk_lookup(table_name, literal.value)]
+        if index:
+            return lambda: [record for literal in node.literals for record in index_lookup(index, literal)]
+        return None
+    if node.op == "=":
+        if node.field == "id" and isinstance(node.literal.value, int):
+            return lambda: pk_lookup(table_name, node.literal.value)
+        return (lambda: index_lookup(index, node.literal)) if index else None
+    if node.op in ("<", "<=", ">", ">=") and index:
+        bound = node.literal.value
+        return lambda: index.range(
+            low=bound if node.op in (">", ">=") else None,
+            high=bound if node.op in ("<", "<=") else None,
+            low_inclusive=(node.op == ">="),
+            high_inclusive=(node.op == "<="),
+        )
+    return None
+
+def parallel_scan(statement):
+    """Whether the statement should scan its table on the worker pool: the table is big, has no
+    column view, and no WHERE term can be answered from an index or the id map."""
+    return (statement.text is not None and parallel.worthwhile(len(current_db[statement.table]))
+            and statement.table not in _columnar
+            and not any(probe_plan(statement.table, node) for node in statement.conjuncts()))
+
+def scan_key(table_name):
+    """Identifies the table's current contents, so the worker pool is re-forked after a change."""
+    return (current_db_file, table_name, _versions.get(table_name))
+
+def find_records(statement, stop=None):
+    """Records matching the WHERE clause, plus their row positions when the column view was used.
+
+    Plan: probe the id map or an index for the first AND term that has one
+    and check the rest with the compiled predicate; otherwise filter on the
+    column view, otherwise scan. `stop` ends a scan after that many matches.
+    """
+    records = current_db[statement.table]
+    if statement.where is None:
+        profiling.record_scan("whole table", len(records), len(records))
+        return records, None
+
+    conjuncts = statement.conjuncts()
+    with phase("probe"):
+        for node in conjuncts:
+            candidates = probe(statement.table, node)
+            if candidates is not None:
+                break
+    if candidates is not None:
+        with phase("filter"):
+            # Back into table order, so LIMIT picks the same rows as a scan would
+            matched = sorted((record for record in candidates if statement.predicate(record)), key=id_key)
+        profiling.record_scan(f"{'id' if node.field == 'id' else 'index'} lookup on {node.field}", len(candidates), len(matched))
+        return matched, None
+
+    columns = columnar_view(statement.table)
+    if columns is not None and all(isinstance(node, Compare) for node in conjuncts):
+        positions = None
+        with phase("scan"):
+            for node in conjuncts:
+                positions = columns.column(node.field).filter(node.op, node.literal, positions)
+        profiling.record_scan("column view filter", len(records), len(positions))
+        return columns.take(positions), positions
+
+    if stop is None and statement.text is not None and parallel.worthwhile(len(records)):
+        with phase("filter"):
+            matched = parallel.scan(records, scan_key(statement.table), statement, _schemas.get(statement.table))
+        profiling.record_scan(f"parallel scan ({parallel.WORKERS} workers)", len(records), len(matched))
+        return matched, None
+
+    if profiling.active is not None:
+        records = profiling.counted(records)
+    with phase("filter"):
+        matched = list(islice((record for record in records if statement.predicate(record)), stop))
+    profiling.record_scan("full scan", None, len(matched))
+    return matched, None
+
+def run_statement(statement):
+    if statement.kind == "drop":
+        return drop_table(statement.table)
+    if statement.table not in current_db:
+        return f"Table '{statement.table}' does not exist."
+    if profiling.active is not None:
+        profiling.active.ran = True
+    if statement.table in _schemas:
+        statement = statement.retyped(casts_for(_schemas[statement.table]))
+    return globals()[f"run_{statement.kind}"](statement)
+
+def cached_result(statement, text):
+    """Output of a read-only statement, reused while its table and the loaded file are unchanged."""
+    global _result_bytes
+    key = (current_db_file, _json_indent, text)
+    version = (_stamp, _versions.get(statement.table))
+    entry = _results.get(key)
+    if entry is not None and entry[0] == version:
+        _results.move_to_end(key)
+        return entry[1]
+
+    output = run_statement(statement)
+    if entry is not None:
+        _result_bytes -= len(entry[1])
+    _results[key] = (version, output)
+    _results.move_to_end(key)
+    _result_bytes += len(output)
+    while _result_bytes > RESULT_CACHE_BYTES:
+        _, (_, evicted) = _results.popitem(last=False)
+        _result_bytes -= len(evicted)
+    return output
+
+def run_aggregate(statement):
+    """select with count/sum/avg/min/max: one streaming pass keeping only per-group accumulators."""
+    group_field = statement.group_by
+    if parallel_scan(statement):
+        # Each worker aggregates its chunk; the partial states are merged here
+        rows = current_db[statement.table]
+        with phase("aggregate"):
+            groups = parallel.aggregate_groups(rows, scan_key(statement.table), statement, _schemas.get(statement.table))
+        profiling.record_scan(f"parallel scan ({parallel.WORKERS} workers)", len(rows), None)
+        aggregated = finish(groups, group_field, statement.aggregates)
+    else:
+        records, _ = find_records(statement)
+        with phase("aggregate"):
+            aggregated = aggregate(records, group_field, statement.aggregates)
+    result = []
+    with phase("aggregate"):
+        for key, values in aggregated:
+            values = iter(values)
+            row = {}
+            for item in statement.columns:
+                if isinstance(item, str):
+                    row[item] = key
+                else:
+                    row[item.label] = next(values)
+            if group_field and group_field not in row:
+                row = {group_field: key, **row}
+            result.append(row)
+
+    if statement.order_by:
+        with phase("sort"):
+            result.sort(key=lambda row: sort_key(row.get(statement.order_by)), reverse=statement.descending)
+    return serialize(page(result, statement))
+
+def page(result, statement):
+    """Apply OFFSET / LIMIT."""
+    if statement.offset or statement.limit is not None:
+        end = None if statement.limit is None else statement.offset + statement.limit
+        return result[statement.offset:end]
+    return result
+
+def project(records, fields):
+    """Copy just `fields` out of each record (missing ones as None)."""
+    return [{field: record.get(field) for field in fields} for record in records]
+
+def run_select(statement):
+    if statement.aggregates:
+        return run_aggregate(statement)
+    table_name = statement.table
+    table_indexes = _indexes.get(table_name, {})
+    fields = statement.fields
+    order_field = statement.order_by
+    reverse = statement.descending
+    stop = None
+    if statement.limit is not None and not statement.group_by and not order_field:
+        stop = statement.offset + statement.limit
+
+    grouped = ordered = sliced = carried_order = False
+    if order_field and not statement.group_by and order_field not in table_indexes and parallel_scan(statement):
+        # Workers filter and sort their chunks; a k-way merge keeps only what the page needs
+        rows = current_db[table_name]
+        top = statement.offset + statement.limit if statement.limit is not None else None
+        with phase("sort"):
+            result = parallel.ordered(rows, scan_key(table_name), statement, _schemas.get(table_name), top)
+        profiling.record_scan(f"parallel scan ({parallel.WORKERS} workers)", len(rows), None)
+        positions = None
+        ordered = True
+    else:
+        result, positions = find_records(statement, stop)
+    columns = columnar_view(table_name)
+
+    # On the column view, group and sort positions before touching any row
+    if columns is not None and (positions is not None or result is current_db[table_name]):
+        if statement.group_by:
+            with phase("group"):
+                groups = ((key, columns.take(rows)) for key, rows in columns.group(statement.group_by, positions))
+                result = [{"group": key, "records": project(rows, fields) if fields else rows} for key, rows in groups]
+            grouped = True
+        elif order_field and order_field not in table_indexes:
+            with phase("sort"):
+                order = columns.column(order_field).order(positions, reverse=reverse)
+            if order is not None:
+                result = columns.take(order)
+                ordered = True
+
+    # An index on the ORDER BY field already holds the order
+    if order_field and not ordered and not statement.group_by and order_field in table_indexes:
+        with phase("sort"):
+            by_index = table_indexes[order_field].ordered(reverse=reverse)
+            if result is current_db[table_name]:
+                result = by_index
+            else:
+                wanted = {id(record) for record in result}
+                result = [record for record in by_index if id(record) in wanted]
+        ordered = True
+
+    # Apply GROUP BY if exists; group members carry only the selected fields
+    if statement.group_by and not grouped:
+        with phase("group"):
+            groups = {}
+            for record in result:
+                group_key = record.get(statement.group_by)
+                if group_key is not None:
+                    groups.setdefault(group_key, []).append(record)
+            result = [{"group": group_key, "records": project(records, fields) if fields else records}
+                      for group_key, records in groups.items()]
+    elif fields and not statement.group_by:
+        # Project before the remaining sort, so rows carry only the selected
+        # fields plus the ORDER BY key; with nothing left to sort, slice first
+        with phase("project"):
+            if ordered or not order_field:
+                result = page(result, statement)
+                sliced = True
+                result = project(result, fields)
+            else:
+                carried_order = order_field not in fields
+                result = project(result, fields + [order_field] if carried_order else fields)
+
+    # Apply ORDER BY if exists
+    if order_field and not ordered:
+        with phase("sort"):
+            # Type-ranked key (numbers before strings) so mixed columns don't raise
+            result = sorted(result, key=lambda x: sort_key(x.get(order_field)), reverse=reverse)
+
+    if not sliced:
+        result = page(result, statement)
+    if carried_order:
+        for record in result:
+            del record[order_field]  # Carried only for the sort
+    return serialize(result)
+
+def serialize(result):
+    if profiling.active is not None:
+        profiling.active.rows_returned = len(result)
+    with phase("serialize"):
+        return json.dumps(result, indent=_json_indent) if result else "No records matched the condition."
+
+def run_update(statement):
+    table_name = statement.table
+    table_indexes = _indexes.get(table_name, {})
+    matched, _ = find_records(statement)
+
+    casts = casts_for(_schemas[table_name]) if table_name in _schemas else None
+    if casts is not None:
+        # Declared types: convert each new value once, before anything changes
+        typed = {}
+        for field_name, text in statement.assignments:
+            if field_name not in casts:
+                return f"Field '{field_name}' is not in the schema of '{table_name}'."
+            try:
+                typed[field_name] = casts[field_name](text)
+            except SchemaError as e:
+                return f"Invalid value for '{field_name}': {e}."
+        changes = [(record, typed) for record in matched]
+    else:
+        # Convert every new value to the type the field already has before
+        # changing any record, so a bad value leaves the table untouched
+        changes = []
+        for record in matched:
+            values = {}
+            for field_name, text in statement.assignments:
+                new_value = text
+                try:
+                    if isinstance(record.get(field_name), int):
+                        new_value = int(text)
+                    elif isinstance(record.get(field_name), float):
+                        new_value = float(text)
+                except ValueError:
+                    return f"Invalid value '{text}' for numeric field '{field_name}'."
+                values[field_name] = new_value
+            changes.append((record, values))
+
+    if not matched:
+        return "No records matched the condition."
+    before_update(table_name, matched)
+    for record, values in changes:
+        for field_name, new_value in values.items():
+            field_index = table_indexes.get(field_name)
+            if field_index:
+                field_index.remove(record)
+            record[field_name] = new_value
+            if field_index:
+                field_index.add(record)
+
+    if "id" in changes[0][1]:
+        reindex_tables(table_name)  # Indexes and the id map are keyed on ids
+    table_changed(table_name)
+    save_db()
+    return f"{len(matched)} record(s) updated in '{table_name}'."
+
+def run_exclude(statement):
+    table_name = statement.table
+
+    # Exclude all records from the table (No WHERE Clause)
+    if statement.where is None:
+        before_change(table_name)
+        current_db[table_name] = []  # Clear all records but keep the table
+        reindex_tables(table_name)
+        save_db()
+        return f"All records excluded from '{table_name}'."
+
+    doomed, _ = find_records(statement)
+    if not doomed:
+        return "No matching records found."
+    remove_records(table_name, doomed)
+    save_db()
+    return f"Excluded {len(doomed)} record(s) from '{table_name}'."
+
+def drop_table(table_name):
+    if table_name not in current_db:
+        return f"Table '{table_name}' does not exist."
+    before_change(table_name)
+    table_changed(table_name)
+    del current_db[table_name]
+    _indexes.pop(table_name, None)
+    _pk.pop(table_name, None)
+    _columnar.pop(table_name, None)
+    _schemas.pop(table_name, None)
+    save_db()
+    return f"Table '{table_name}' has been excluded."
+
+def run_delete(statement):
+    table_name = statement.table
+    field_name = statement.delete_field
+    matched, _ = find_records(statement)
+
+    if field_name is None:
+        if matched:
+            remove_records(table_name, matched)
+            save_db()
+        return f"Deleted {len(matched)} record(s)."
+
+    if any(field_name not in record for record in matched):
+        return f"Field '{field_name}' not found in the record."
+    if matched:
+        before_update(table_name, matched)
+    field_index = _indexes.get(table_name, {}).get(field_name)
+    table_changed(table_name)
+    for record in matched:
+        if field_index:
+            field_index.remove(record)
+        del record[field_name]
+        if field_index:
+            field_index.add(record)
+    if matched:
+        save_db()
+    return f"Deleted {len(matched)} record(s)."
+
+def run_count(statement):
+    if statement.where is None:
+        profiling.record_scan("table length", 0, len(current_db[statement.table]))
+        return f"Table '{statement.table}' contains {len(current_db[statement.table])} record(s)."
+
+    # A numeric range on an indexed field is counted by bisecting the sorted index
+    node = statement.where
+    index = _indexes.get(statement.table, {}).get(getattr(node, "field", None))
+    if (index and isinstance(node, Compare) and node.op in ("<", "<=", ">", ">=")
+            and isinstance(node.literal.value, (int, float))):
+        bound = node.literal.value
+        count = index.count_range(
+            low=bound if node.op in (">", ">=") else None,
+            high=bound if node.op in ("<", "<=") else None,
+            low_inclusive=(node.op == ">="),
+            high_inclusive=(node.op == "<="),
+        )
+        profiling.record_scan(f"index range count on {node.field}", 0, count)
+    else:
+        # Equality probes touch only the matching bucket of an index
+        count = len(find_records(statement)[0])
+    return f"{count} record(s) in '{statement.table}' match the condition."
+
+def remove_records(table_name, doomed):
+    """Drop the given record dicts from a table and its indexes."""
+    before_change(table_name)
+    records = current_db[table_name]
+    if len(doomed) == 1:
+        records.remove(doomed[0])  # Records are unique by id, so this finds the same dict
+    else:
+        doomed_ids = {id(record) for record in doomed}
+        current_db[table_name] = [record for record in records if id(record) not in doomed_ids]
+    index_remove(table_name, doomed)
+
+def export_tables(table_name, path, format_name=None):
+    """Stream one table, or every table ('*'), to a file.
+
+    With '*', JSON goes to a single {table: [records]} file while CSV and NDJSON
+    write one <table>.<format> file per table into the directory at path.
+    """
+    try:
+        format = format_for(path, format_name)
+    except ValueError as e:
+        return str(e)
+    if table_name != "*" and table_name not in current_db:
+        return f"Table '{table_name}' does not exist."
+    try:
+        if table_name != "*":
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                count = write_rows(current_db[table_name], f, format)
+            return f"Exported {count} record(s) from '{table_name}' to {path}."
+        if format == "json":
+            with open(path, "w", encoding="utf-8") as f:
+                count = write_tables(((name, current_db[name]) for name in list(current_db)), f)
+            return f"Exported {count} record(s) from {len(current_db)} table(s) to {path}."
+        os.makedirs(path, exist_ok=True)
+        count = 0
+        for name in list(current_db):
+            with open(os.path.join(path, f"{name}.{format}"), "w", newline="", encoding="utf-8") as f:
+                count += write_rows(current_db[name], f, format)
+        return f"Exported {count} record(s) from {len(current_db)} table(s) to {path}/."
+    except OSError as e:
+        return f"Error exporting: {e}"
+
+def import_table(table_name, path, format_name=None):
+    """Stream records from a file into a table (created if missing) in batches, saving once."""
+    try:
+        format = format_for(path, format_name)
+    except ValueError as e:
+        return str(e)
+    if not os.path.isfile(path):
+        return f"File '{path}' does not exist."
+    if table_name not in current_db:
+        before_change(table_name)
+        current_db[table_name] = []
+        _id_counter[table_name] = 0
+        table_changed(table_name)
+    casts = casts_for(_schemas[table_name]) if table_name in _schemas else None
+    count = 0
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            for chunk in chunks(read_rows(f, format)):
+                if casts is not None:
+                    for position, record in enumerate(chunk):
+                        try:
+                            coerce_record(record, casts)
+                        except SchemaError as e:
+                            raise SchemaError(f"record {count + position + 1}: {e}") from None
+                append_records(table_name, chunk)
+                count += len(chunk)
+    except (ValueError, csv.Error) as e:
+        save_db()  # Keep the batches already added, as separate includes would have
+        return f"Import stopped after {count} record(s): {e}"
+    save_db()
+    return f"Imported {count} record(s) into '{table_name}'."
 
 def process_command(command):
-    global current_db, current_db_file
-    
     tokens = command.strip().split()
 
+    if not tokens:
+        return "Invalid command."
+
     # Remove the semicolon if present at the end of the command
     if tokens[-1].endswith(";"):
         tokens[-1] = tokens[-1][:-1]
 
-    if not tokens:
-        return "Invalid command."
-
     action = tokens[0].lower()
+
+    if _txn is not None and action in ("use", "exit", "remove", "convert"):
+        return "A transaction is open. COMMIT or ROLLBACK it first."
     
     if action == "show" and len(tokens) == 2 and tokens[1].lower() == "databases":
-        # List all JSON database files in the current directory
-        databases = [f for f in os.listdir() if f.endswith(".json")]
+        # List all database files (JSON or binary) in the current directory
+        databases = [f for f in os.listdir() if f.endswith((".json", ".cdb"))]
         return "Databases: " + ", ".join(databases) if databases else "No databases found."
     
     elif action == "create" and len(tokens) == 3 and tokens[1].lower() == "database":
         db_name = tokens[2]
         db_path = f"{db_name}.json"
         
-        if os.path.exists(db_path):
+        if os.path.exists(db_path) or os.path.exists(f"{db_name}.cdb"):
             return f"Database '{db_name}' already exists."
         
         # Create an empty JSON file
@@ -83,7 +850,7 @@ def process_command(command):
     
     elif action == "use" and len(tokens) == 2:
         db_name = tokens[1]
-        db_path = f"{db_name}.json"  # Direct JSON file name
+        db_path = db_path_for(db_name)
 
         if not os.path.exists(db_path):
             return f"Database '{db_name}' does not exist."
@@ -98,14 +865,13 @@ def process_command(command):
         if current_db is None:
             return "No database is currently in use."
 
-        db_path = f"{db_name}.json"  # Direct JSON file name
+        db_path = db_path_for(db_name)
         if not os.path.exists(db_path):
             return f"Database '{db_name}' does not exist."
 
         if current_db_file == db_path:
             save_db()  # Save changes before exiting
-            current_db_file = None
-            current_db = None
+            close_db(cache=True)
             return f"Exited from database '{db_name}'. You can now use another database."
         else:
             return f"Database '{db_name}' is not currently in use."
@@ -114,29 +880,87 @@ def process_command(command):
 
     elif action == "remove" and len(tokens) == 2:
         db_name = tokens[1]
-        db_path = f"{db_name}.json"  # Direct JSON file name
+        db_path = db_path_for(db_name)
 
         if not os.path.exists(db_path):
             return f"Database '{db_name}' does not exist."
 
-        os.remove(db_path)  # Delete the JSON file
         if current_db_file == db_path:
-            current_db_file = None
-            current_db = None
+            close_db()
+        forget_db(db_path)
+        os.remove(db_path)  # Delete the database file
 
         return f"Database '{db_name}' deleted successfully."
 
+    elif action == "convert" and len(tokens) == 4 and tokens[2].lower() == "to":
+        db_name, target = tokens[1], tokens[3].lower()
+        json_path, binary_path = f"{db_name}.json", f"{db_name}.cdb"
+        if target not in ("binary", "json"):
+            return "Syntax error. Usage: CONVERT database_name TO BINARY|JSON;"
+        source = json_path if target == "binary" else binary_path
+        if not os.path.exists(source):
+            return f"Database '{db_name}' has no {'JSON' if target == 'binary' else 'binary'} file to convert."
+        in_use = current_db_file in (json_path, binary_path)
+        if in_use:
+            save_db()
+            close_db()
+        forget_db(source)
+        if target == "binary":
+            json_to_binary(json_path, binary_path, META_KEY)
+        else:
+            binary_to_json(binary_path, json_path, META_KEY)
+        os.remove(source)
+        if in_use:
+            load_db(db_name)
+        return f"Database '{db_name}' converted to {target}."
+
 
 
+    elif action == "make" and len(tokens) == 4 and tokens[1].lower() == "index":
+        if current_db is None:
+            return "No database selected. Use 'USE database_name' to select a database."
+
+        table_name, field = tokens[2], tokens[3]
+        if table_name not in current_db:
+            return f"Table '{table_name}' does not exist."
+        if field in _indexes.get(table_name, {}):
+            return f"Index on '{table_name}.{field}' already exists."
+        build_index(table_name, field)
+        save_db()
+        return f"Index on '{table_name}.{field}' created successfully."
+
+    elif action == "make" and len(tokens) == 3 and tokens[1].lower() == "columnar":
+        if current_db is None:
+            return "No database selected. Use 'USE database_name' to select a database."
+
+        table_name = tokens[2]
+        if table_name not in current_db:
+            return f"Table '{table_name}' does not exist."
+        _columnar[table_name] = None
+        save_db()
+        return f"Table '{table_name}' now uses the columnar layout for select."
+
     elif action == "make" and len(tokens) >= 2:
         if current_db is None:
             return "No database selected. Use 'USE database_name' to select a database."
 
-        table_name = tokens[1]
+        # make table_name [(field type, ...)]
+        table_name, _, declaration = command.strip().rstrip(";").split(None, 1)[1].partition("(")
+        table_name = table_name.strip()
         if table_name in current_db:
             return f"Table '{table_name}' already exists."
+        schema = None
+        if declaration:
+            try:
+                schema = parse_schema("(" + declaration)
+            except SchemaError as e:
+                return f"Invalid schema: {e}."
+        before_change(table_name)
+        if schema:
+            _schemas[table_name] = schema
         current_db[table_name] = []
         _id_counter[table_name] = 0  # Initialize ID counter for the table
+        table_changed(table_name)
         save_db()
         return f"Table '{table_name}' created successfully."
 
@@ -166,6 +990,9 @@ def process_command(command):
 
             # Parse and check for duplicate keys in each individual object
             for obj in json.loads(raw_records, object_pairs_hook=lambda pairs: pairs):
+                # Objects come back as lists of (key, value) tuples from the hook
+                if not isinstance(obj, list) or not all(isinstance(pair, tuple) for pair in obj):
+                    return "Invalid data format. Each entry should be a JSON object."
                 seen_keys = set()
                 obj_dict = {}
                 for key, value in obj:
@@ -179,20 +1006,14 @@ def process_command(command):
                 return "Invalid format. Expected an array of JSON objects."
 
             if table_name in current_db:
-                inserted_ids = []
-
-                for record in parsed_records:
-                    if isinstance(record, dict):  
-                        # Auto-increment ID
-                        _id_counter[table_name] += 1
-                        record["id"] = _id_counter[table_name]
-
-                        current_db[table_name].append(record)
-                        inserted_ids.append(record["id"])
-                    else:
-                        return "Invalid data format. Each entry should be a JSON object."
-
-                save_db()
+                if table_name in _schemas:
+                    casts = casts_for(_schemas[table_name])
+                    for position, record in enumerate(parsed_records):
+                        try:
+                            coerce_record(record, casts)
+                        except SchemaError as e:
+                            return f"Record {position + 1} does not match the schema of '{table_name}': {e}."
+                inserted_ids = insert_records(table_name, parsed_records)
                 return f"{len(inserted_ids)} records included into '{table_name}' with IDs {inserted_ids}."
             else:
                 return f"Table '{table_name}' does not exist."
@@ -201,252 +1022,43 @@ def process_command(command):
 
 
 
-    elif action == "select":
-        if len(tokens) < 2:
-            return "Syntax error. Usage: SELECT table_name [field_name] WHERE condition [ORDER BY field_name ASC/DESC] [GROUP BY field_name];"
-
-        table_name = tokens[1]
-        fields = []
-        condition_clause = None
-        order_field = None
-        order_direction = "asc"
-        group_field = None
-        where_index = len(tokens)
-        
-        # Check for WHERE condition
-        if "where" in tokens:
-            where_index = tokens.index("where")
-            condition_clause = " ".join(tokens[where_index + 1:])
-            fields = tokens[2:where_index] if len(tokens) > 2 and tokens[2] != "where" else []
-        else:
-            fields = tokens[2:] if len(tokens) > 2 else []
-
-        # Handle ORDER BY clause
-        if "order" in tokens and "by" in tokens:
-            order_index = tokens.index("order")
-            order_field = tokens[order_index + 2]
-            if len(tokens) > order_index + 3 and tokens[order_index + 3].lower() in ["asc", "desc"]:
-                order_direction = tokens[order_index + 3].lower()
-
-        # Handle GROUP BY clause
-        if "group" in tokens and "by" in tokens:
-            group_index = tokens.index("group")
-            group_field = tokens[group_index + 2]
-
-        fields = [field.strip() for field in " ".join(fields).split(",") if field.strip()]
-
-        if table_name in current_db:
-            result = current_db[table_name]
-
-            # Apply WHERE condition if exists
-            if condition_clause:
-                condition_field, condition_value = condition_clause.split("=")
-                condition_field = condition_field.strip()
-                condition_value = condition_value.strip().strip("'")
-                result = [record for record in result if record.get(condition_field) == condition_value]
-
-            # Apply GROUP BY if exists
-            if group_field:
-                grouped = {}
-                for record in result:
-                    group_key = record.get(group_field)
-                    if group_key is not None:
-                        if group_key not in grouped:
-                            grouped[group_key] = []
-                        grouped[group_key].append(record)
-                result = [{"group": group_key, "records": records} for group_key, records in grouped.items()]
-
-            # Apply ORDER BY if exists
-            if order_field:
-                result = sorted(result, key=lambda x: x.get(order_field, ""), reverse=(order_direction == "desc"))
-
-            if fields:
-                result = [{field: record.get(field) for field in fields} for record in result]
-
-            return json.dumps(result, indent=4) if result else "No records matched the condition."
-        else:
-            return f"Table '{table_name}' does not exist."
-    
-
-    elif action == "update":
-        if "set" not in tokens or "where" not in tokens:
-            return "Syntax error. Usage: UPDATE table_name SET field_name = new_value WHERE condition;"
-
-        table_name = tokens[1]
-        set_index = tokens.index("set")
-        where_index = tokens.index("where")
-
-        # Extract the SET clause and WHERE clause
-        set_clause = " ".join(tokens[set_index + 1:where_index])
-        where_clause = " ".join(tokens[where_index + 1:])
-
-        if "=" not in set_clause or "=" not in where_clause:
-            return "Syntax error in SET or WHERE clause."
-
-        # Split the SET clause into field_name and new_value
-        field_name, new_value = set_clause.split("=")
-        field_name = field_name.strip()
-        new_value = new_value.strip().strip('"')
-
-        # Split the WHERE clause into condition_field and condition_value
-        condition_field, condition_value = where_clause.split("=")
-        condition_field = condition_field.strip()
-        condition_value = condition_value.strip().strip('"')
-
-        if table_name in current_db:
-            modified_count = 0  # Initialize the counter
-            for record in current_db[table_name]:
-                if str(record.get(condition_field)) == condition_value:
-                    # Convert the new value to the correct type
-                    if isinstance(record.get(field_name), int):
-                        new_value = int(new_value)
-                    elif isinstance(record.get(field_name), float):
-                        new_value = float(new_value)
-
-                    # Update the record
-                    record[field_name] = new_value
-                    modified_count += 1  # Increment the counter
-
-            if modified_count > 0:
-                save_db()
-                return f"{modified_count} record(s) updated in '{table_name}'."
-            else:
-                return "No records matched the condition."
-        else:
-            return f"Table '{table_name}' does not exist."
-
-
-
-    elif action == "exclude":
-            if len(tokens) < 2:
-                return "Syntax error. Usage: EXCLUDE table_name; OR EXCLUDE FROM table_name WHERE condition;"
-
-            # Case 1: Exclude the entire table (Delete table itself)
-            if len(tokens) == 2:
-                table_name = tokens[1]
-
-                # Ensure table exists
-                if table_name not in current_db:
-                    return f"Table '{table_name}' does not exist."
-
-                # Delete the entire table
-                del current_db[table_name]
-                save_db()
-                return f"Table '{table_name}' has been excluded."
-
-            # Case 2: Exclude records from a table (Must include 'FROM')
-            if tokens[1].lower() == "from":
-                if len(tokens) < 3:
-                    return "Syntax error. Usage: EXCLUDE FROM table_name; OR EXCLUDE FROM table_name WHERE condition;"
-
-                table_name = tokens[2]
-
-                # Ensure table exists
-                if table_name not in current_db:
-                    return f"Table '{table_name}' does not exist."
-
-                # Case 2a: Exclude all records from the table (No WHERE Clause)
-                if len(tokens) == 3:
-                    current_db[table_name] = []  # Clear all records but keep the table
-                    save_db()
-                    return f"All records excluded from '{table_name}'."
-
-                # Case 2b: Exclude specific records using WHERE condition
-                if len(tokens) > 3 and tokens[3].lower() == "where":
-                    if len(tokens) < 6 or "=" not in " ".join(tokens[4:]):
-                        return "Syntax error in WHERE clause. Expected format: EXCLUDE FROM table_name WHERE field = value;"
-
-                    # Extract condition clause
-                    condition_clause = " ".join(tokens[4:])
-                    condition_field, condition_value = condition_clause.split("=")
-                    condition_field = condition_field.strip()
-                    condition_value = condition_value.strip().strip("'")
-
-                    # Convert condition value type if necessary
-                    for record in current_db[table_name]:
-                        if condition_field in record:
-                            if isinstance(record[condition_field], int):
-                                condition_value = int(condition_value)
-                            elif isinstance(record[condition_field], float):
-                                condition_value = float(condition_value)
-                            break  # Stop checking after the first record
-
-                    # Remove matching records
-                    original_count = len(current_db[table_name])
-                    current_db[table_name] = [record for record in current_db[table_name] if record.get(condition_field) != condition_value]
-
-                    # Save and return response
-                    if len(current_db[table_name]) < original_count:
-                        save_db()
-                        return f"Excluded {original_count - len(current_db[table_name])} record(s) from '{table_name}'."
-                    else:
-                        return "No matching records found."
-
-            return "Syntax error. Use: EXCLUDE table_name; OR EXCLUDE FROM table_name WHERE condition;"
-
-
-
-    elif action == "delete":
+    elif action in ("begin", "commit", "rollback") and (len(tokens) == 1 or tokens[1].lower() in ("transaction", "work")):
+        if current_db is None:
+            return "No database selected. Use 'USE database_name' to select a database."
+        if action == "begin":
+            if _txn is not None:
+                return "A transaction is already open."
+            begin()
+            return "Transaction started. Changes are saved at COMMIT."
+        if _txn is None:
+            return "No transaction is open."
+        if action == "commit":
+            commit()
+            return "Transaction committed."
+        rollback()
+        return "Transaction rolled back."
+
+    elif action in USAGE:
+        if current_db is None:
+            return "No database selected. Use 'USE database_name' to select a database."
         try:
-            if len(tokens) < 4 or tokens[2] != "from" or "where" not in tokens:
-                return "Syntax error. Usage: DELETE [field_name] FROM table_name WHERE condition;"
-
-            table_name = tokens[3]
-            where_index = tokens.index("where")
-            condition_clause = " ".join(tokens[where_index + 1:])
-
-            if "=" not in condition_clause:
-                return "Syntax error in WHERE clause."
-            
-            condition_field, condition_value = condition_clause.split("=")
-            condition_field = condition_field.strip()
-            condition_value = condition_value.strip().strip("'")
-
-            if table_name in current_db:
-                modified_count = 0
-
-                # Type conversion for numerical fields
-                for record in current_db[table_name]:
-                    if condition_field in record:
-                        if isinstance(record[condition_field], int):
-                            condition_value = int(condition_value)
-                        elif isinstance(record[condition_field], float):
-                            condition_value = float(condition_value)
-                        break
-
-                if len(tokens) > 4:
-                    field_name = tokens[1]  
-                    
-                    for record in current_db[table_name]:
-                        if record.get(condition_field) == condition_value:
-                            if field_name in record:
-                                del record[field_name]
-                                modified_count += 1
-                            else:
-                                return f"Field '{field_name}' not found in the record."
-                else:
-                    current_db[table_name] = [r for r in current_db[table_name] if r.get(condition_field) != condition_value]
-                    modified_count += 1
-
-                return f"Deleted {modified_count} record(s)."
-            else:
-                return f"Table '{table_name}' not found."
-
-        except Exception as e:
-            return f"Error processing delete command: {e}"
- # Stop after removing the first matching record
-                    
-    elif action == "count":
-        if len(tokens) < 2:
-            return "Syntax error. Usage: COUNT table_name;"
-
-        table_name = tokens[1]
-
-        if table_name in current_db:
-            record_count = len(current_db[table_name])
-            return f"Table '{table_name}' contains {record_count} record(s)."
-        else:
-            return f"Table '{table_name}' does not exist."
+            with phase("parse"):
+                statement = compile_statement(command)
+        except QuerySyntaxError as e:
+            return f"Syntax error: {e}. Usage: {USAGE[action]}"
+        if statement.kind in READ_KINDS and profiling.active is None and statement.table in current_db:
+            return cached_result(statement, normalize(command))
+        return run_statement(statement)
+
+    elif action == "explain" and len(tokens) >= 3 and tokens[1].lower() == "analyze":
+        # Runs the statement (changes included, as in SQL) and reports where the time went
+        with profiling.profiling() as profile:
+            started = time.perf_counter()
+            result = process_command(command.strip().split(None, 2)[2])
+            total = time.perf_counter() - started
+        if not profile.ran:
+            return result  # Not a query, or it failed before running
+        return profile.report(total)
         
     elif action == "show" and len(tokens) == 2 and tokens[1].lower() == "tables":
     # Show all table names
@@ -455,59 +1067,35 @@ def process_command(command):
             return f"Tables: {', '.join(table_names)}"
         else:
             return "No tables found."
+
+    elif action == "describe" and len(tokens) == 2:
+        if current_db is None:
+            return "No database selected. Use 'USE database_name' to select a database."
+        table_name = tokens[1]
+        if table_name not in current_db:
+            return f"Table '{table_name}' does not exist."
+        if table_name not in _schemas:
+            return f"Table '{table_name}' has no declared schema."
+        return f"{table_name} (" + ", ".join(f"{field} {type_name}" for field, type_name in _schemas[table_name].items()) + ")"
         
 
 
     elif action == "export":
-        root = tk.Tk()
-        root.withdraw()  # Hide the root window
-
-        # Ask user to select file format
-        file_path = filedialog.asksaveasfilename(
-            defaultextension="",
-            filetypes=[("JSON files", "*.json"), ("CSV files", "*.csv")],
-            title="Save Database As"
-        )
-
-        if not file_path:  # If the user cancels
-            return "Export canceled."
-
-        try:
-            if file_path.endswith(".json"):  # Export as JSON
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump(current_db, f, indent=4)
-                return f"✅ Database successfully exported as JSON! File saved at: {file_path}"
-
-            elif file_path.endswith(".csv"):  # Export as CSV
-                with open(file_path, "w", newline="", encoding="utf-8") as csv_file:
-                    writer = csv.writer(csv_file)
-
-                    if isinstance(current_db, dict):  # Ensure valid structure
-                        for table_name, records in current_db.items():
-                            if isinstance(records, list) and records:  # Ensure it's a list of dicts
-                                writer.writerow([f"Table: {table_name}"])  # Write table name
-                                writer.writerow(records[0].keys())  # Column headers
-
-                                for record in records:
-                                    writer.writerow(record.values())  # Row values
-
-                                writer.writerow([])  # Blank line for separation
-                    else:
-                        return "❌ Error: Invalid database structure for CSV export."
-
-                return f"✅ Database successfully exported as CSV! File saved at: {file_path}"
-
-            else:
-                return "❌ Error: Unsupported file format."
+        if len(tokens) not in (4, 6) or tokens[2].lower() != "to" or (len(tokens) == 6 and tokens[4].lower() != "format"):
+            return "Syntax error. Usage: EXPORT table_name|* TO path [FORMAT csv|ndjson|json];"
+        if current_db is None:
+            return "No database selected. Use 'USE database_name' to select a database."
+        return export_tables(tokens[1], tokens[3], tokens[5] if len(tokens) == 6 else None)
 
-        except Exception as e:
-            return f"❌ Error exporting database: {e}"
+    elif action == "import":
+        if len(tokens) not in (4, 6) or tokens[2].lower() != "from" or (len(tokens) == 6 and tokens[4].lower() != "format"):
+            return "Syntax error. Usage: IMPORT table_name FROM path [FORMAT csv|ndjson|json];"
+        if current_db is None:
+            return "No database selected. Use 'USE database_name' to select a database."
+        return import_table(tokens[1], tokens[3], tokens[5] if len(tokens) == 6 else None)
 
-    return f"Error exporting database: {e}"
-<<<<<<< HEAD:student-management/cli.py
+    return "Invalid command."
 
-=======
->>>>>>> 0590f186fd4c53521bce3156adeb3373e28045c7:cli.py
 
 
 def cli():
@@ -515,10 +1103,118 @@ def cli():
     while True:
         command = input("db> ")
         if command.lower() == "exit":
+            if _txn is not None:
+                print("Open transaction discarded.")
             break
         response = process_command(command)
         print(response)
 
+def split_statements(lines):
+    """Yield the ;-terminated statements in an iterable of lines, skipping -- comment lines.
+
+    A ; inside quotes does not end a statement; a last statement without ; is still yielded.
+    """
+    buffer, quote = [], None
+    for line in lines:
+        if quote is None and not "".join(buffer).strip() and line.lstrip().startswith("--"):
+            continue
+        start = 0
+        escaped = False
+        for i, char in enumerate(line):
+            if escaped:
+                escaped = False
+            elif quote:
+                if char == "\\":
+                    escaped = True
+                elif char == quote:
+                    quote = None
+            elif char in "\"'":
+                quote = char
+            elif char == ";":
+                buffer.append(line[start:i])
+                start = i + 1
+                statement = "".join(buffer).replace("\n", " ").strip()
+                buffer = []
+                if statement:
+                    yield statement
+        buffer.append(line[start:])
+    statement = "".join(buffer).replace("\n", " ").strip()
+    if statement:
+        yield statement
+
+def run_script(lines, out=sys.stdout, timing=False):
+    """Run every statement in lines, writing one NDJSON result line per statement.
+
+    Statements run in an implicit transaction that is committed (one save) at the end, or
+    before a statement that switches databases. Explicit begin/commit/rollback split it.
+    """
+    global _json_indent
+    _json_indent = None
+    count = 0
+    started = time.perf_counter()
+    try:
+        for statement in split_statements(lines):
+            if statement.lower() == "exit":
+                break
+            action = statement.split()[0].lower()
+            if _txn is not None and action in ("use", "exit", "remove", "convert", "begin"):
+                commit()
+            if _txn is None and current_db is not None and action not in ("begin", "commit", "rollback"):
+                begin()
+
+            statement_started = time.perf_counter()
+            try:
+                response = process_command(statement)
+                error = None
+            except Exception as e:
+                response, error = None, f"{type(e).__name__}: {e}"
+            elapsed = time.perf_counter() - statement_started
+            count += 1
+
+            line = {"statement": statement}
+            if error is not None:
+                line["error"] = error
+            if timing:
+                line["ms"] = round(elapsed * 1000, 3)
+            text = json.dumps(line)
+            if response is not None:
+                # Select output is already compact JSON; splice it in rather than quoting it
+                result = response if response[:1] in ("[", "{") else json.dumps(response)
+                text = f'{text[:-1]}, "result": {result}}}'
+            out.write(text + "\n")
+            out.flush()
+    finally:
+        if _txn is not None:
+            commit()
+        _json_indent = 4
+    total = time.perf_counter() - started
+    if timing:
+        rate = count / total if total else 0.0
+        print(f"{count} statement(s) in {total:.3f} s ({rate:.1f} statements/s)", file=sys.stderr)
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SimpleDB CLI. Without -f or piped input it starts the interactive prompt.")
+    parser.add_argument("--db", help="database to use before running any statement")
+    parser.add_argument("-f", "--file", help="run the ;-separated statements in this file ('-' for stdin) and print NDJSON")
+    parser.add_argument("--timing", action="store_true", help="add per-statement ms to each result and print the total rate to stderr")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        response = process_command(f"use {args.db}")
+        if current_db is None:
+            print(response, file=sys.stderr)
+            return 1
+
+    if args.file is None and sys.stdin.isatty():
+        cli()
+    elif args.file is None or args.file == "-":
+        run_script(sys.stdin, timing=args.timing)
+    else:
+        with open(args.file) as f:
+            run_script(f, timing=args.timing)
+    return 0
+
 if __name__ == "__main__":
-    cli()
+    sys.exit(main())
     
\ No newline at end of file
@@ -0,0 +1,188 @@
+import operator
+from array import array
+
+from query import in_range, values_equal
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the array-module fallback gives the same answers
+    np = None
+
+OPS = {"=": operator.eq, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+INT64_MAX = 2 ** 63 - 1
+
+
+class Column:
+    """One field of a table: typed values plus a validity mask for rows missing the key.
+
+    kind is "int" or "float" (array/NumPy buffer), "str" (dictionary-encoded:
+    codes index into `dictionary`, -1 when missing) or "object" (plain list,
+    used for anything mixed, nested or null).
+    """
+
+    def __init__(self, field, records):
+        self.field = field
+        present = [record.get(field) for record in records if field in record]
+        self.kind = self._infer_kind(present)
+        self.valid = bytearray(field in record for record in records)
+
+        if self.kind == "int":
+            self.values = array("q", (record.get(field, 0) for record in records))
+        elif self.kind == "float":
+            self.values = array("d", (float(record.get(field, 0)) for record in records))
+        elif self.kind == "str":
+            self.dictionary = []
+            self.codes = {}
+            self.values = array("q")
+            for record in records:
+                if field in record:
+                    value = record[field]
+                    code = self.codes.get(value)
+                    if code is None:
+                        code = self.codes[value] = len(self.dictionary)
+                        self.dictionary.append(value)
+                    self.values.append(code)
+                else:
+                    self.values.append(-1)
+        else:
+            self.values = [record.get(field) for record in records]
+
+        if np is not None and self.kind != "object":
+            # Zero-copy views over the array buffers
+            dtype = np.float64 if self.kind == "float" else np.int64
+            self.np_values = np.frombuffer(self.values, dtype=dtype)
+            self.np_valid = np.frombuffer(self.valid, dtype=np.uint8).astype(bool)
+
+    @staticmethod
+    def _infer_kind(present):
+        if not present:
+            return "object"
+        if all(type(v) is int and -INT64_MAX <= v <= INT64_MAX for v in present):
+            return "int"
+        if all(type(v) in (int, float) for v in present) and all(abs(v) < 2 ** 53 for v in present if type(v) is int):
+            return "float"
+        if all(type(v) is str for v in present):
+            return "str"
+        return "object"
+
+    def _positions(self, positions):
+        return range(len(self.valid)) if positions is None else positions
+
+    def filter(self, op, literal, positions=None):
+        """Row positions where `field op literal` holds, with the same rules as the compiled row predicate.
+
+        `literal` is a query.Literal: numbers compare by typed value, while
+        string values also match the literal as written. Range operators only
+        match values of the same kind as the literal.
+        """
+        if op == "!=":
+            hits = set(self.filter("=", literal, positions))
+            return [i for i in self._positions(positions) if i not in hits]
+
+        value = literal.value
+        if self.kind in ("int", "float"):
+            if isinstance(value, (str, bool)):
+                return []
+            if np is not None:
+                mask = self.np_valid & OPS[op](self.np_values, value)
+                hits = np.flatnonzero(mask)
+                if positions is not None:
+                    hits = hits[np.isin(hits, positions, assume_unique=True)]
+                return hits.tolist()
+            compare = OPS[op]
+            values, valid = self.values, self.valid
+            return [i for i in self._positions(positions) if valid[i] and compare(values[i], value)]
+
+        if self.kind == "str":
+            # Evaluate the predicate once per distinct string, then match codes
+            if op == "=":
+                wanted = {self.codes[literal.text]} if literal.text in self.codes else set()
+            elif isinstance(value, str):
+                wanted = {code for code, text in enumerate(self.dictionary) if OPS[op](text, value)}
+            else:
+                wanted = set()
+            if not wanted:
+                return []
+            if np is not None:
+                hits = np.flatnonzero(np.isin(self.np_values, list(wanted)))
+                if positions is not None:
+                    hits = hits[np.isin(hits, positions, assume_unique=True)]
+                return hits.tolist()
+            codes = self.values
+            return [i for i in self._positions(positions) if codes[i] in wanted]
+
+        values = self.values
+        if op == "=":
+            return [i for i in self._positions(positions) if values_equal(values[i], literal)]
+        return [i for i in self._positions(positions) if in_range(values[i], op, literal)]
+
+    def order(self, positions=None, reverse=False):
+        """Stable ordering of positions by field (missing sorts as ""), or None if the column can't be sorted."""
+        if self.kind in ("int", "float"):
+            if 0 in self.valid:
+                return None  # Missing keys would compare "" with numbers
+            keys = self.np_values if np is not None else self.values
+        elif self.kind == "str":
+            ranks = {text: rank for rank, text in enumerate(sorted(set(self.dictionary) | {""}))}
+            code_rank = [ranks[text] for text in self.dictionary]
+            missing = ranks[""]
+            if np is not None:
+                lookup = np.array(code_rank + [missing], dtype=np.int64)
+                keys = lookup[self.np_values]  # -1 picks the trailing "missing" entry
+            else:
+                keys = array("q", (code_rank[code] if code >= 0 else missing for code in self.values))
+        else:
+            return None
+
+        if np is not None:
+            subset = np.arange(len(self.valid)) if positions is None else np.asarray(positions, dtype=np.int64)
+            subset_keys = keys[subset]
+            order = np.argsort(-subset_keys if reverse else subset_keys, kind="stable")
+            return subset[order].tolist()
+        return sorted(self._positions(positions), key=keys.__getitem__, reverse=reverse)
+
+    def group(self, records, positions=None):
+        """[(key, [positions])] in first-appearance order, skipping missing and null keys."""
+        if self.kind == "str":
+            codes = self.values
+            by_code = {}
+            for i in self._positions(positions):
+                code = codes[i]
+                if code >= 0:
+                    by_code.setdefault(code, []).append(i)
+            return [(self.dictionary[code], rows) for code, rows in by_code.items()]
+        # Float columns may hold ints, so group on the original values
+        values = self.values if self.kind in ("int", "object") else [record.get(self.field) for record in records]
+        valid = self.valid
+        groups = {}
+        for i in self._positions(positions):
+            if valid[i] and values[i] is not None:
+                groups.setdefault(values[i], []).append(i)
+        return list(groups.items())
+
+
+class ColumnarTable:
+    """Read-optimised column view of a table, built on demand per field.
+
+    The row dicts stay the source of truth (every other command edits them
+    in place); the view is rebuilt after the table changes.
+    """
+
+    def __init__(self, records):
+        self.rows = records
+        self.columns = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column(self, field):
+        if field not in self.columns:
+            self.columns[field] = Column(field, self.rows)
+        return self.columns[field]
+
+    def group(self, field, positions=None):
+        return self.column(field).group(self.rows, positions)
+
+    def take(self, positions):
+        rows = self.rows
+        return [rows[i] for i in positions]
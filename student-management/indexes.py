@@ -0,0 +1,125 @@
+import json
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+
+def sort_key(value):
+    """Order numbers before strings and everything else, so mixed columns still sort."""
+    if isinstance(value, (int, float)):
+        return (0, value)
+    if value is None:
+        return (1, "")  # Missing fields sort like "" (the ORDER BY default)
+    if isinstance(value, str):
+        return (1, value)
+    return (2, json.dumps(value, sort_keys=True))
+
+
+def hash_key(value):
+    if isinstance(value, (list, dict)):
+        return ("__json__", json.dumps(value, sort_keys=True))
+    return value
+
+
+def id_key(record):
+    """Table order: ids grow with every insert, so ties are broken by id to match a scan."""
+    return sort_key(record.get("id"))
+
+
+class FieldIndex:
+    """Hash index for equality lookups plus a sorted index for ORDER BY and ranges.
+
+    Both hold references to the table's record dicts, so they must be told
+    about every insert, change and removal through add()/remove(). Equal
+    keys are kept in id order, so results match a stable sort of the table.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self.buckets = {}
+        self.keys = []
+        self.ids = []  # id_key of each entry in self.rows, ascending within a run of equal keys
+        self.rows = []
+
+    def build(self, records):
+        self.buckets = {}
+        entries = sorted(((sort_key(r.get(self.field)), id_key(r), i) for i, r in enumerate(records)))
+        self.keys = [k for k, _, _ in entries]
+        self.ids = [rid for _, rid, _ in entries]
+        self.rows = [records[i] for _, _, i in entries]
+        for record in records:
+            self.buckets.setdefault(hash_key(record.get(self.field)), []).append(record)
+
+    def _tie_range(self, key):
+        return bisect_left(self.keys, key), bisect_right(self.keys, key)
+
+    def add(self, record):
+        value = record.get(self.field)
+        self.buckets.setdefault(hash_key(value), []).append(record)
+        key = sort_key(value)
+        rid = id_key(record)
+        start, end = self._tie_range(key)
+        pos = bisect_right(self.ids, rid, start, end)
+        self.keys.insert(pos, key)
+        self.ids.insert(pos, rid)
+        self.rows.insert(pos, record)
+
+    def remove(self, record):
+        value = record.get(self.field)
+        bucket = self.buckets.get(hash_key(value), [])
+        for i, row in enumerate(bucket):
+            if row is record:
+                del bucket[i]
+                break
+        if not bucket:
+            self.buckets.pop(hash_key(value), None)
+
+        start, end = self._tie_range(sort_key(value))
+        first = bisect_left(self.ids, id_key(record), start, end)
+        for pos in chain(range(first, end), range(start, first)):
+            if self.rows[pos] is record:
+                del self.keys[pos]
+                del self.ids[pos]
+                del self.rows[pos]
+                break
+
+    def lookup(self, value):
+        """Records whose field equals `value`, in id order."""
+        return sorted(self.buckets.get(hash_key(value), []), key=id_key)  # Near-sorted already: appends come in id order
+
+    def range(self, low=None, high=None, low_inclusive=True, high_inclusive=True):
+        """Records with low <(=) field <(=) high, in ascending order."""
+        start, end = self._bounds(low, high, low_inclusive, high_inclusive)
+        return self.rows[start:end]
+
+    def count_range(self, low=None, high=None, low_inclusive=True, high_inclusive=True):
+        """How many records range() would return, in O(log n)."""
+        start, end = self._bounds(low, high, low_inclusive, high_inclusive)
+        return max(end - start, 0)
+
+    def _bounds(self, low, high, low_inclusive, high_inclusive):
+        start = 0
+        end = len(self.keys)
+        if low is not None:
+            key = sort_key(low)
+            start = bisect_left(self.keys, key) if low_inclusive else bisect_right(self.keys, key)
+        if high is not None:
+            key = sort_key(high)
+            end = bisect_right(self.keys, key) if high_inclusive else bisect_left(self.keys, key)
+            # Keep the comparison within the same type family as the bound
+            if low is None:
+                start = max(start, bisect_left(self.keys, (key[0],)))
+        elif low is not None:
+            end = bisect_left(self.keys, (sort_key(low)[0] + 1,))
+        return start, end
+
+    def ordered(self, reverse=False):
+        """Records in field order; ties stay in id order either way, like a stable sort of the table."""
+        if not reverse:
+            return list(self.rows)
+        result = []
+        end = len(self.keys)
+        while end > 0:
+            start = bisect_left(self.keys, self.keys[end - 1], 0, end)
+            result.extend(self.rows[start:end])
+            end = start
+        return result
@@ -0,0 +1,127 @@
+"""Full scans of large tables on a pool of worker processes.
+
+The pool is forked with the table already in memory, so workers read rows
+copy-on-write instead of having them pickled; each gets a range of row
+positions and sends back only what the parent needs: matching positions,
+(sort key, position) pairs already sorted for a k-way merge, or partial
+aggregate states. Workers rebuild the statement from its text, since
+compiled predicates can't be pickled. The pool is kept while the table it
+was forked with is unchanged.
+"""
+import heapq
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from operator import itemgetter
+
+from aggregate import accumulate, merge_groups
+from indexes import sort_key
+from query import compile_statement
+from schema import casts_for
+
+# Tables smaller than this are scanned in-process: forking and merging cost more than they save
+PARALLEL_MIN_ROWS = 250_000
+WORKERS = os.cpu_count() or 1
+CHUNKS_PER_WORKER = 4
+
+_rows = None  # The table the pool was forked with; workers read it by position
+_pool = None
+_pool_key = None
+
+
+def worthwhile(row_count):
+    return WORKERS > 1 and row_count >= PARALLEL_MIN_ROWS and "fork" in multiprocessing.get_all_start_methods()
+
+
+def shutdown():
+    global _rows, _pool, _pool_key
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+    _rows = _pool = _pool_key = None  # Don't keep a dropped or replaced table alive
+
+
+def release(owner):
+    """Shut the pool down if its key starts with `owner`, e.g. (db file, table) for a table that just changed."""
+    if _pool_key is not None and _pool_key[:len(owner)] == owner:
+        shutdown()
+
+
+def _pool_for(rows, key):
+    global _rows, _pool, _pool_key
+    if _pool is None or _pool_key != key or _rows is not rows:
+        shutdown()
+        _rows = rows  # Set before the workers fork, so they inherit it
+        _pool = ProcessPoolExecutor(WORKERS, mp_context=multiprocessing.get_context("fork"))
+        _pool_key = key
+    return _pool
+
+
+def _run(rows, key, fn, *args):
+    """fn(start, end, *args) over chunks of the table on the pool; results in chunk order."""
+    global _rows
+    size = max(1, -(-len(rows) // (WORKERS * CHUNKS_PER_WORKER)))
+    bounds = [(start, min(start + size, len(rows))) for start in range(0, len(rows), size)]
+    try:
+        pool = _pool_for(rows, key)
+        futures = [pool.submit(fn, start, end, *args) for start, end in bounds]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory): drop the pool and do the work here
+        shutdown()
+        _rows = rows
+        try:
+            return [fn(start, end, *args) for start, end in bounds]
+        finally:
+            _rows = None
+
+
+def _statement(text, schema):
+    statement = compile_statement(text)
+    return statement.retyped(casts_for(schema)) if schema else statement
+
+
+def _matching(start, end, text, schema):
+    predicate = _statement(text, schema).predicate
+    if predicate is None:
+        return range(start, end)
+    rows = _rows
+    return [position for position in range(start, end) if predicate(rows[position])]
+
+
+def _sorted_chunk(start, end, text, schema, field, reverse, top):
+    rows = _rows
+    keyed = [(sort_key(rows[position].get(field)), position) for position in _matching(start, end, text, schema)]
+    keyed.sort(key=itemgetter(0), reverse=reverse)  # Stable, so equal keys keep table order
+    return keyed if top is None else keyed[:top]
+
+
+def _aggregate_chunk(start, end, text, schema):
+    statement = _statement(text, schema)
+    rows = _rows
+    records = (rows[position] for position in _matching(start, end, text, schema))
+    return accumulate(records, statement.group_by, statement.aggregates)
+
+
+def scan(rows, key, statement, schema=None):
+    """Rows matching the statement's WHERE clause, in table order."""
+    chunks = _run(rows, key, _matching, statement.text, schema)
+    return [rows[position] for chunk in chunks for position in chunk]
+
+
+def ordered(rows, key, statement, schema=None, top=None):
+    """Matching rows sorted by ORDER BY: each chunk sorted by a worker, then merged. `top` keeps only the first rows."""
+    field, reverse = statement.order_by, statement.descending
+    chunks = _run(rows, key, _sorted_chunk, statement.text, schema, field, reverse, top)
+    merged = heapq.merge(*chunks, key=itemgetter(0), reverse=reverse)
+    if top is not None:
+        merged = (item for _, item in zip(range(top), merged))
+    return [rows[position] for _, position in merged]
+
+
+def aggregate_groups(rows, key, statement, schema=None):
+    """Accumulated groups for the statement's aggregates, merged from per-chunk partial states."""
+    groups = {}
+    for partial in _run(rows, key, _aggregate_chunk, statement.text, schema):
+        merge_groups(groups, partial, statement.aggregates)
+    return groups
@@ -0,0 +1,68 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+_OFF = nullcontext()
+
+active = None  # The Profile being filled in by `explain analyze`, or None
+
+
+class Profile:
+    """Per-phase wall time and row counts for one statement."""
+
+    def __init__(self):
+        self.phases = {}  # name -> seconds, in first-use order
+        self.ran = False  # Set once the statement got past parsing and table lookup
+        self.plan = "full scan"
+        self.rows_scanned = 0
+        self.rows_matched = None
+        self.rows_returned = None
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - started
+
+    def report(self, total):
+        lines = [f"Plan: {self.plan}"]
+        for name, seconds in self.phases.items():
+            lines.append(f"  {name:<10} {seconds * 1000:10.3f} ms")
+        lines.append(f"Rows scanned: {self.rows_scanned}")
+        if self.rows_matched is not None:
+            lines.append(f"Rows matched: {self.rows_matched}")
+        if self.rows_returned is not None:
+            lines.append(f"Rows returned: {self.rows_returned}")
+        lines.append(f"Total: {total * 1000:.3f} ms")
+        return "\n".join(lines)
+
+
+def phase(name):
+    """Time a block into the active profile; a shared no-op when nothing is being profiled."""
+    return _OFF if active is None else active.phase(name)
+
+
+def record_scan(plan, scanned, matched):
+    """Note how a WHERE clause was answered: rows read (None if already counted) and rows that matched."""
+    if active is not None:
+        active.plan = plan
+        active.rows_scanned += scanned or 0
+        active.rows_matched = matched
+
+
+def counted(records):
+    """Iterate records, counting each one read as scanned."""
+    for record in records:
+        active.rows_scanned += 1
+        yield record
+
+
+@contextmanager
+def profiling():
+    global active
+    active = Profile()
+    try:
+        yield active
+    finally:
+        active = None
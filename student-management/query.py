@@ -0,0 +1,438 @@
+import copy
+import operator
+import re
+from functools import lru_cache
+
+from aggregate import FUNCTIONS, Aggregate
+from indexes import sort_key
+
+KEYWORDS = {"select", "update", "delete", "exclude", "count", "from", "where", "set", "and", "or", "not",
+            "in", "order", "group", "by", "asc", "desc", "limit", "offset"}
+RANGE_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>'[^']*'|"[^"]*")
+      | (?P<op>>=|<=|!=|<>|=|<|>)
+      | (?P<punct>[(),*])
+      | (?P<word>[^\s'"(),=<>!*]+)
+    )""", re.VERBOSE)
+
+
+class QuerySyntaxError(ValueError):
+    pass
+
+
+class Literal:
+    """A value from the query: `value` is typed (int/float/str), `text` is what was written."""
+
+    def __init__(self, value, text):
+        self.value = value
+        self.text = text
+
+    @classmethod
+    def parse(cls, token, quoted=False):
+        if quoted:
+            return cls(token, token)
+        for cast in (int, float):
+            try:
+                return cls(cast(token), token)
+            except ValueError:
+                pass
+        return cls(token, token)
+
+    def retyped(self, cast):
+        """This literal converted (from its written form) to a field's declared type, or unchanged if it doesn't convert."""
+        try:
+            return Literal(cast(self.text), self.text)
+        except ValueError:
+            return self
+
+
+def values_equal(value, literal):
+    """Typed equality, but a string field also matches the literal as written (`age = 30` matches 30 and "30")."""
+    if isinstance(value, bool):
+        return isinstance(literal.value, bool) and value == literal.value  # Only a declared bool literal
+    if value is None:
+        return False
+    return value == literal.value or (isinstance(value, str) and value == literal.text)
+
+
+def in_range(value, op, literal):
+    """Range comparison that only matches values of the same kind (number vs string) as the literal."""
+    if value is None:
+        return False
+    value_key, bound_key = sort_key(value), sort_key(literal.value)
+    return value_key[0] == bound_key[0] and RANGE_OPS[op](value_key, bound_key)
+
+
+class Compare:
+    def __init__(self, field, op, literal):
+        self.field = field
+        self.op = "!=" if op == "<>" else op
+        self.literal = literal
+
+    def compile(self):
+        field, op, literal = self.field, self.op, self.literal
+        if op == "=":
+            return lambda record: values_equal(record.get(field), literal)
+        if op == "!=":
+            return lambda record: not values_equal(record.get(field), literal)
+        return lambda record: in_range(record.get(field), op, literal)
+
+    def fields(self):
+        return {self.field}
+
+    def retyped(self, casts):
+        cast = casts.get(self.field)
+        return self if cast is None else Compare(self.field, self.op, self.literal.retyped(cast))
+
+
+class In:
+    def __init__(self, field, literals, negated=False):
+        self.field = field
+        self.literals = literals
+        self.negated = negated
+
+    def compile(self):
+        field, literals, negated = self.field, self.literals, self.negated
+
+        def predicate(record):
+            value = record.get(field)
+            return any(values_equal(value, literal) for literal in literals) != negated
+        return predicate
+
+    def fields(self):
+        return {self.field}
+
+    def retyped(self, casts):
+        cast = casts.get(self.field)
+        return self if cast is None else In(self.field, [literal.retyped(cast) for literal in self.literals], self.negated)
+
+
+class BoolOp:
+    def __init__(self, op, items):
+        self.op = op  # "and" / "or"
+        self.items = items
+
+    def compile(self):
+        predicates = [item.compile() for item in self.items]
+        if self.op == "and":
+            return lambda record: all(p(record) for p in predicates)
+        return lambda record: any(p(record) for p in predicates)
+
+    def fields(self):
+        return set().union(*(item.fields() for item in self.items))
+
+    def retyped(self, casts):
+        return BoolOp(self.op, [item.retyped(casts) for item in self.items])
+
+
+class Statement:
+    """Parsed form of one CLI statement, plus its compiled WHERE predicate."""
+
+    def __init__(self, kind, table):
+        self.kind = kind
+        self.table = table
+        self.text = None          # normalized statement text, set by compile_statement
+        self.fields = []          # select projection
+        self.aggregates = []      # select count(*), avg(age), ...
+        self.columns = []         # select output order: field names and Aggregates
+        self.where = None
+        self.assignments = []     # update: [(field, text)]
+        self.delete_field = None  # delete <field> from ...
+        self.group_by = None
+        self.order_by = None
+        self.descending = False
+        self.limit = None
+        self.offset = 0
+        self.predicate = None
+
+    def conjuncts(self):
+        """The top-level AND terms of WHERE (a single term if there is no AND)."""
+        if self.where is None:
+            return []
+        if isinstance(self.where, BoolOp) and self.where.op == "and":
+            return self.where.items
+        return [self.where]
+
+    def retyped(self, casts):
+        """A copy whose WHERE literals are converted to the table's declared types (casts: field -> function)."""
+        if self.where is None:
+            return self
+        statement = copy.copy(self)  # Parsed statements are cached and shared
+        statement.where = self.where.retyped(casts)
+        statement.predicate = statement.where.compile()
+        return statement
+
+
+def _scan(text):
+    pos = 0
+    text = text.strip().rstrip(";").rstrip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise QuerySyntaxError(f"Unexpected character at: {text[pos:].strip()[:20]}")
+        pos = match.end()
+        yield match
+
+
+def tokenize(text):
+    tokens = []
+    for match in _scan(text):
+        kind = match.lastgroup
+        token = match.group(kind)
+        if kind == "string":
+            tokens.append(("string", token[1:-1]))
+        else:
+            tokens.append((kind, token))
+    return tokens
+
+
+class Parser:
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def at_keyword(self, *words):
+        kind, value = self.peek()
+        return kind == "word" and value.lower() in words
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise QuerySyntaxError("Unexpected end of statement")
+        self.pos += 1
+        return token
+
+    def expect_keyword(self, word):
+        kind, value = self.next()
+        if kind != "word" or value.lower() != word:
+            raise QuerySyntaxError(f"Expected '{word.upper()}' but found '{value}'")
+
+    def name(self):
+        kind, value = self.next()
+        if kind != "word" or value.lower() in KEYWORDS:
+            raise QuerySyntaxError(f"Expected a name but found '{value}'")
+        return value
+
+    def integer(self):
+        kind, value = self.next()
+        if kind != "word" or not value.isdigit():
+            raise QuerySyntaxError(f"Expected a number but found '{value}'")
+        return int(value)
+
+    def literal(self):
+        kind, value = self.next()
+        if kind == "string":
+            return Literal.parse(value, quoted=True)
+        if kind != "word":
+            raise QuerySyntaxError(f"Expected a value but found '{value}'")
+        # Unquoted multi-word values (where name = John Doe) run up to the next keyword
+        words = [value]
+        while self.peek()[0] == "word" and self.peek()[1].lower() not in KEYWORDS:
+            words.append(self.next()[1])
+        return Literal.parse(" ".join(words))
+
+    def parse(self):
+        kind, action = self.next()
+        action = (action or "").lower()
+        handler = getattr(self, f"parse_{action}", None)
+        if kind != "word" or handler is None:
+            raise QuerySyntaxError(f"Unknown statement '{action}'")
+        statement = handler()
+        if self.peek()[0] is not None:
+            raise QuerySyntaxError(f"Unexpected '{self.peek()[1]}'")
+        if statement.where is not None:
+            statement.predicate = statement.where.compile()
+        if statement.aggregates:
+            for field in statement.fields:
+                if field != statement.group_by:
+                    raise QuerySyntaxError(f"Field '{field}' must appear in GROUP BY to be selected with aggregates")
+        return statement
+
+    def select_item(self):
+        """A field name, or an aggregate call such as count(*) / avg(age)."""
+        kind, value = self.next()
+        if kind != "word":
+            raise QuerySyntaxError(f"Unexpected '{value}' in field list")
+        if self.peek() != ("punct", "("):
+            return value
+        if value.lower() not in FUNCTIONS:
+            raise QuerySyntaxError(f"Unknown function '{value}'")
+        self.next()
+        if self.peek() == ("punct", "*") and value.lower() == "count":
+            self.next()
+            field = "*"
+        else:
+            field = self.name()
+        if self.next() != ("punct", ")"):
+            raise QuerySyntaxError(f"Expected ')' after {value}({field}")
+        return Aggregate(value.lower(), field)
+
+    def has_from(self):
+        """True for the SQL form `select <items> from <table>`."""
+        for kind, value in self.tokens[self.pos:]:
+            if kind == "word" and value.lower() in ("where", "group", "order", "limit", "offset"):
+                return False
+            if kind == "word" and value.lower() == "from":
+                return True
+        return False
+
+    def parse_select(self):
+        items = []
+        if self.has_from():
+            while not self.at_keyword("from"):
+                if self.peek() == ("punct", ","):
+                    self.next()
+                elif self.peek() == ("punct", "*"):
+                    self.next()
+                else:
+                    items.append(self.select_item())
+            self.next()
+            statement = Statement("select", self.name())
+        else:
+            statement = Statement("select", self.name())
+            while self.peek()[0] is not None and not self.at_keyword("where", "order", "group", "limit", "offset"):
+                if self.peek()[0] == "punct" and self.peek()[1] in (",", "*"):
+                    self.next()
+                else:
+                    items.append(self.select_item())
+        statement.columns = items
+        statement.fields = [item for item in items if isinstance(item, str)]
+        statement.aggregates = [item for item in items if isinstance(item, Aggregate)]
+
+        while self.peek()[0] is not None:
+            if self.at_keyword("where") and statement.where is None:
+                self.next()
+                statement.where = self.expression()
+            elif self.at_keyword("group"):
+                self.next()
+                self.expect_keyword("by")
+                statement.group_by = self.name()
+            elif self.at_keyword("order"):
+                self.next()
+                self.expect_keyword("by")
+                order_item = self.select_item()
+                statement.order_by = order_item.label if isinstance(order_item, Aggregate) else order_item
+                if self.at_keyword("asc", "desc"):
+                    statement.descending = self.next()[1].lower() == "desc"
+            elif self.at_keyword("limit"):
+                self.next()
+                statement.limit = self.integer()
+            elif self.at_keyword("offset"):
+                self.next()
+                statement.offset = self.integer()
+            else:
+                raise QuerySyntaxError(f"Unexpected '{self.peek()[1]}'")
+        return statement
+
+    def parse_update(self):
+        statement = Statement("update", self.name())
+        self.expect_keyword("set")
+        while True:
+            field = self.name()
+            kind, value = self.next()
+            if value != "=":
+                raise QuerySyntaxError("Expected '=' in SET clause")
+            statement.assignments.append((field, self.literal().text))
+            if self.peek() == ("punct", ","):
+                self.next()
+                continue
+            break
+        self.expect_keyword("where")
+        statement.where = self.expression()
+        return statement
+
+    def parse_delete(self):
+        field = None if self.at_keyword("from") else self.name()
+        self.expect_keyword("from")
+        statement = Statement("delete", self.name())
+        statement.delete_field = field
+        self.expect_keyword("where")
+        statement.where = self.expression()
+        return statement
+
+    def parse_exclude(self):
+        if self.at_keyword("from"):
+            self.next()
+            statement = Statement("exclude", self.name())
+            if self.at_keyword("where"):
+                self.next()
+                statement.where = self.expression()
+            return statement
+        statement = Statement("drop", self.name())
+        return statement
+
+    def parse_count(self):
+        statement = Statement("count", self.name())
+        if self.at_keyword("where"):
+            self.next()
+            statement.where = self.expression()
+        return statement
+
+    # expression := term (OR term)* ; term := factor (AND factor)*
+    def expression(self):
+        items = [self.term()]
+        while self.at_keyword("or"):
+            self.next()
+            items.append(self.term())
+        return items[0] if len(items) == 1 else BoolOp("or", items)
+
+    def term(self):
+        items = [self.factor()]
+        while self.at_keyword("and"):
+            self.next()
+            items.append(self.factor())
+        return items[0] if len(items) == 1 else BoolOp("and", items)
+
+    def factor(self):
+        if self.peek() == ("punct", "("):
+            self.next()
+            node = self.expression()
+            if self.next() != ("punct", ")"):
+                raise QuerySyntaxError("Expected ')'")
+            return node
+        field = self.name()
+        negated = False
+        if self.at_keyword("not"):
+            self.next()
+            negated = True
+        if self.at_keyword("in"):
+            self.next()
+            if self.next() != ("punct", "("):
+                raise QuerySyntaxError("Expected '(' after IN")
+            literals = [self.literal()]
+            while self.peek() == ("punct", ","):
+                self.next()
+                literals.append(self.literal())
+            if self.next() != ("punct", ")"):
+                raise QuerySyntaxError("Expected ')' to close IN list")
+            return In(field, literals, negated)
+        if negated:
+            raise QuerySyntaxError("Expected IN after NOT")
+        kind, op = self.next()
+        if kind != "op":
+            raise QuerySyntaxError(f"Expected a comparison after '{field}'")
+        return Compare(field, op, self.literal())
+
+
+def normalize(text):
+    """The statement's tokens one space apart: spacing outside quotes doesn't matter, inside it is kept."""
+    return " ".join(match.group(match.lastgroup) for match in _scan(text))
+
+
+@lru_cache(maxsize=256)
+def _compile(normalized):
+    statement = Parser(normalized).parse()
+    statement.text = normalized
+    return statement
+
+
+def compile_statement(text):
+    """Parse a statement into a Statement, reusing the cached plan for repeated text."""
+    return _compile(normalize(text))
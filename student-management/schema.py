@@ -0,0 +1,101 @@
+"""Declared field types for CLI tables: `make users (name str, age int, email str)`.
+
+Values are converted to the declared type once, when records are included,
+imported or updated, so queries compare typed values without guessing.
+null is allowed for every type; fields not in the schema are rejected.
+"""
+import re
+
+FIELD_RE = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)\s+([A-Za-z]+)$")
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def to_str(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    raise SchemaError(f"expected text, got {type(value).__name__}")
+
+
+def to_int(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    raise SchemaError(f"expected an integer, got {value!r}")
+
+
+def to_float(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            pass
+    raise SchemaError(f"expected a number, got {value!r}")
+
+
+def to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ("true", "false", "yes", "no", "1", "0"):
+        return value.strip().lower() in ("true", "yes", "1")
+    raise SchemaError(f"expected true or false, got {value!r}")
+
+
+CASTS = {"str": to_str, "int": to_int, "float": to_float, "bool": to_bool}
+
+
+def parse_schema(text):
+    """`(name str, age int)` -> {"name": "str", "age": "int"}."""
+    text = text.strip()
+    if not (text.startswith("(") and text.endswith(")")):
+        raise SchemaError("expected (field type, ...)")
+    schema = {}
+    for item in text[1:-1].split(","):
+        match = FIELD_RE.match(item.strip())
+        if not match:
+            raise SchemaError(f"expected 'field type' but found '{item.strip()}'")
+        field, type_name = match.group(1), match.group(2).lower()
+        if type_name not in CASTS:
+            raise SchemaError(f"unknown type '{type_name}' (use {', '.join(CASTS)})")
+        if field == "id":
+            raise SchemaError("'id' is assigned automatically")
+        if field in schema:
+            raise SchemaError(f"field '{field}' is declared twice")
+        schema[field] = type_name
+    return schema
+
+
+def casts_for(schema):
+    """{field: conversion function} for a schema."""
+    return {field: CASTS[type_name] for field, type_name in schema.items()}
+
+
+def coerce_record(record, casts):
+    """Convert a record's values in place to the declared types; raises SchemaError naming the field."""
+    for field, value in record.items():
+        cast = casts.get(field)
+        if cast is None:
+            if field != "id":
+                raise SchemaError(f"field '{field}' is not in the schema")
+        elif value is not None:
+            try:
+                record[field] = cast(value)
+            except SchemaError as e:
+                raise SchemaError(f"field '{field}': {e}") from None
+    return record
@@ -0,0 +1,177 @@
+"""Streaming table export and import in CSV, NDJSON or JSON (array of objects).
+
+Rows are written and parsed in chunks of CHUNK_ROWS, so neither side ever
+holds a whole file's text. CSV has one column per key seen in any row
+(union of keys, first-seen order); on import an empty cell means the key is
+absent, and cells that read as JSON numbers, booleans, null, objects or
+arrays get those types back.
+"""
+import csv
+import json
+import re
+from itertools import islice
+
+FORMATS = ("csv", "ndjson", "json")
+CHUNK_ROWS = 10000
+READ_BYTES = 1 << 20
+MAX_RECORD_CHARS = 64 * READ_BYTES  # One JSON record may span at most this much text
+_CUT_OFF_CHARS = 16  # Longer than any prefix of a number or literal a read can end in
+
+_NUMBER = re.compile(r"-?(?:0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?\Z")  # JSON's number grammar
+_CONSTANTS = {"true": True, "false": False, "null": None}
+
+
+def format_for(path, name=None):
+    """The format named explicitly, else the one implied by the path's extension (JSON by default)."""
+    if name is not None:
+        name = name.lower()
+        if name not in FORMATS:
+            raise ValueError(f"Unknown format '{name}'. Use one of: {', '.join(FORMATS)}.")
+        return name
+    extension = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    return {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson"}.get(extension, "json")
+
+
+def chunks(rows, size=CHUNK_ROWS):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def discover_fields(records):
+    fields = {}
+    for record in records:
+        for key in record:
+            fields.setdefault(key, None)
+    return list(fields)
+
+
+def _cell(value):
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _typed(cell):
+    number = _NUMBER.match(cell)
+    if number:
+        return float(cell) if number.group(1) or number.group(2) else int(cell)
+    if cell in _CONSTANTS:
+        return _CONSTANTS[cell]
+    if cell[:1] in "[{":
+        try:
+            return json.loads(cell)
+        except ValueError:
+            pass
+    return cell
+
+
+def write_rows(records, f, format):
+    """Write a table's records to an open text file; returns the row count."""
+    count = 0
+    if format == "csv":
+        fields = discover_fields(records)
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for chunk in chunks(records):
+            writer.writerows([_cell(record[key]) if key in record else "" for key in fields] for record in chunk)
+            count += len(chunk)
+    elif format == "ndjson":
+        for chunk in chunks(records):
+            f.write("".join(json.dumps(record) + "\n" for record in chunk))
+            count += len(chunk)
+    else:
+        f.write("[")
+        for chunk in chunks(records):
+            f.write(("\n" if not count else ",\n") + ",\n".join(json.dumps(record) for record in chunk))
+            count += len(chunk)
+        f.write("\n]\n" if count else "]\n")
+    return count
+
+
+def write_tables(tables, f):
+    """Write several tables as one JSON object ({table: [records]}); returns the total row count."""
+    count = 0
+    f.write("{")
+    for i, (table_name, records) in enumerate(tables):
+        f.write(("\n" if not i else ",\n") + json.dumps(table_name) + ": ")
+        count += write_rows(records, f, "json")
+    f.write("}\n")
+    return count
+
+
+def _iter_json_array(f):
+    """Objects from a JSON array, decoded incrementally from READ_BYTES reads.
+
+    A failed decode only means "read more" while the error sits at the very
+    end of the buffer (a value cut off by the read); anywhere else, or once
+    one value would pass MAX_RECORD_CHARS, the error is reported with its
+    position in the file.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, started = "", 0, False
+    consumed = 0  # Characters dropped from the front of the buffer so far
+    while True:
+        error = None
+        while True:
+            # Skip whitespace and separators up to the next value
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array of objects.")
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                error = e
+                if e.msg.startswith("Unterminated string") or e.pos >= len(buffer) - _CUT_OFF_CHARS:
+                    break  # Incomplete value: read more
+                raise _located(e, consumed) from None
+            if not isinstance(value, dict):
+                raise ValueError("Each entry should be a JSON object.")
+            yield value
+            position = end
+        more = f.read(READ_BYTES)
+        if not more:
+            if error is not None:
+                raise _located(error, consumed) from None
+            if buffer[position:].strip():
+                raise ValueError("Unexpected end of JSON array.")
+            return
+        if len(buffer) - position > MAX_RECORD_CHARS:
+            raise ValueError(f"Record at character {consumed + position} is over {MAX_RECORD_CHARS} characters: {error.msg}.")
+        consumed += position
+        buffer = buffer[position:] + more
+        position = 0
+
+
+def _located(error, consumed):
+    return ValueError(f"{error.msg} at character {consumed + error.pos}.")
+
+
+def read_rows(f, format):
+    """Yield records from an open text file in the given format."""
+    if format == "csv":
+        reader = csv.reader(f)
+        fields = next(reader, None) or []
+        for row in reader:
+            yield {key: _typed(cell) for key, cell in zip(fields, row) if cell != ""}
+    elif format == "ndjson":
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("Each line should be a JSON object.")
+                yield record
+    else:
+        yield from _iter_json_array(f)
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "student-management")]
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch):
+    """The CLI module with a fresh database `t` in use, kept under tmp_path."""
+    import cli
+    import parallel
+
+    monkeypatch.chdir(tmp_path)
+    cli._results.clear()
+    cli._result_bytes = 0
+    cli.process_command("create database t")
+    cli.process_command("use t")
+    yield cli
+    if cli._txn is not None:
+        cli.rollback()
+    cli.close_db()
+    for db_path in list(cli._open_dbs):
+        cli.forget_db(db_path)
+    cli._results.clear()
+    cli._result_bytes = 0
+    parallel.shutdown()
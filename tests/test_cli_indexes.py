@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+QUERIES = [
+    "select {} where m = 2",
+    "select {} where m > 1 limit 5",
+    "select {} where m != x order by m",
+    "select {} where m <= 3 order by m desc limit 7",
+    "select {} where k >= 2 order by k desc",
+    "select {} where k < 4 order by k limit 9 offset 3",
+    "select {} where m in (1, 3) limit 6",
+    "select {} where k in (2, 1) order by m limit 10",
+    "select {} order by m desc",
+    "select {} k where m = x",
+    "select k, count(*), min(m), max(id) from {} group by k order by k",
+    "count {} where k > 2",
+]
+CHANGES = [
+    "update {} set m = 2 where k = 3",
+    "update {} set k = 1 where m = 1",
+    "delete m from {} where k = 4",
+    "exclude from {} where m = 3 and k = 0",
+    'include {} [{{"m": 3, "k": 0}}, {{"k": 5}}]',
+]
+
+
+def records(seed, n=300):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        row = {"m": rng.choice([1, 2, 3, "x"]), "k": rng.randint(0, 5)}
+        if rng.random() < 0.1:
+            del row["m"]
+        rows.append(row)
+    return rows
+
+
+def answers(cli, table):
+    cli._results.clear()
+    return [cli.process_command(query.format(table)).replace(table, "X") for query in QUERIES]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_indexed_and_columnar_tables_answer_like_plain_ones(cli, seed):
+    rows = records(seed)
+    for table in ("plain", "indexed", "columnar"):
+        cli.process_command(f"make {table}")
+        cli.insert_records(table, [dict(row) for row in rows])
+    cli.process_command("make index indexed m")
+    cli.process_command("make index indexed k")
+    cli.process_command("make columnar columnar")
+
+    rng = random.Random(seed)
+    for change in [None] + rng.sample(CHANGES * 2, 6):
+        if change is not None:
+            for table in ("plain", "indexed", "columnar"):
+                cli.process_command(change.format(table))
+        expected = answers(cli, "plain")
+        assert answers(cli, "indexed") == expected, change
+        assert answers(cli, "columnar") == expected, change
+
+
+def test_index_survives_reload(cli):
+    cli.process_command("make users")
+    cli.insert_records("users", [dict(row) for row in records(7)])
+    cli.process_command("make index users m")
+    before = answers(cli, "users")
+    cli.close_db()
+    cli.process_command("use t")
+    assert "m" in cli._indexes["users"]
+    assert answers(cli, "users") == before
+
+
+def test_parallel_scan_matches_sequential(cli, monkeypatch):
+    import parallel
+
+    cli.process_command("make big")
+    cli.insert_records("big", records(11, 3000))
+    cli.process_command("make index big k")
+    monkeypatch.setattr(parallel, "PARALLEL_MIN_ROWS", 10**9)
+    sequential = answers(cli, "big")
+
+    monkeypatch.setattr(parallel, "WORKERS", 3)
+    monkeypatch.setattr(parallel, "PARALLEL_MIN_ROWS", 1000)
+    assert answers(cli, "big") == sequential
+    cli.process_command("update big set m = 9 where k = 2")  # Workers must not keep the old rows
+    monkeypatch.setattr(parallel, "PARALLEL_MIN_ROWS", 10**9)
+    sequential = answers(cli, "big")
+    monkeypatch.setattr(parallel, "PARALLEL_MIN_ROWS", 1000)
+    assert answers(cli, "big") == sequential
@@ -0,0 +1,137 @@
+import io
+import json
+import random
+
+import pytest
+
+CHANGES = [
+    'include u [{"n": 3, "s": "new"}]',
+    "update u set s = changed where n = 3",
+    "delete s from u where n = 1",
+    "exclude from u where n = 5",
+    'include u [{"n": 4}]',
+    "update u set n = 9 where s = x10",
+    "update u set n = 3 where n = 4",
+    "exclude from u where id = 2",
+    "exclude from w",
+    "import u from rows.ndjson",
+    "make index u s",
+    "make columnar u",
+    "make z",
+    'include z [{"a": 1}]',
+    "drop w",
+    'include typed [{"name": "b", "age": "3"}]',
+    "drop typed",
+    "make other (name str)",
+]
+QUERIES = [
+    "select u where n = 3",
+    "select u order by n limit 10",
+    "select u where s = changed",
+    "count u where n > 2",
+    "select w",
+    "select z",
+]
+
+
+@pytest.fixture
+def tables(cli, tmp_path):
+    cli.process_command("make u")
+    cli.process_command("make w")
+    cli.insert_records("u", [{"n": i % 7, "s": f"x{i}"} for i in range(50)])
+    cli.insert_records("w", [{"n": i} for i in range(5)])
+    cli.process_command("make index u n")
+    cli.process_command("make typed (name str, age int)")
+    (tmp_path / "rows.ndjson").write_text("".join(json.dumps({"n": 100 + i}) + "\n" for i in range(5)))
+    return cli
+
+
+def state(cli):
+    tables = json.dumps(dict(cli.current_db), sort_keys=True)
+    indexes = {table: sorted(fields) for table, fields in cli._indexes.items()}
+    return tables, dict(cli._id_counter), indexes, sorted(cli._columnar), dict(cli._schemas)
+
+
+def answers(cli):
+    cli._results.clear()
+    return [cli.process_command(query) for query in QUERIES]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_rollback_restores_tables_and_queries(tables, seed):
+    cli = tables
+    before, expected = state(cli), answers(cli)
+    changes = random.Random(seed).sample(CHANGES, random.randint(1, 8))
+
+    assert cli.process_command("begin").startswith("Transaction")
+    for change in changes:
+        cli.process_command(change)
+    cli.process_command("rollback")
+
+    assert state(cli) == before, changes
+    assert answers(cli) == expected, changes
+    cli.close_db()
+    cli.process_command("use t")  # Nothing reached the file either
+    assert state(cli) == before, changes
+
+
+def test_commit_saves_once(tables, tmp_path):
+    cli = tables
+    saved = (tmp_path / "t.json").read_text()
+    cli.process_command("begin")
+    cli.process_command('include u [{"n": 3, "s": "kept"}]')
+    cli.process_command("update u set s = y where id = 1")
+    assert (tmp_path / "t.json").read_text() == saved
+    cli.process_command("commit")
+
+    cli.close_db()
+    cli.process_command("use t")
+    assert cli.process_command("count u where s = kept") == "1 record(s) in 'u' match the condition."
+    assert json.loads(cli.process_command("select u where id = 1"))[0]["s"] == "y"
+
+
+def test_schema_converts_and_rejects(cli):
+    assert "created" in cli.process_command("make typed (name str, age int, gpa float)")
+    cli.process_command('include typed [{"name": 5, "age": "7", "gpa": 3}]')
+    assert cli.current_db["typed"] == [{"name": "5", "age": 7, "gpa": 3.0, "id": 1}]
+
+    assert "expected an integer" in cli.process_command('include typed [{"age": "x"}]')
+    assert "not in the schema" in cli.process_command('include typed [{"zz": 1}]')
+    assert "expected an integer" in cli.process_command("update typed set age = abc where id = 1")
+    assert "unknown type 'blob'" in cli.process_command("make bad (name blob)")
+    assert len(cli.current_db["typed"]) == 1
+
+    cli.process_command("update typed set age = 12 where id = 1")
+    cli.close_db()
+    cli.process_command("use t")
+    assert cli._schemas["typed"] == {"name": "str", "age": "int", "gpa": "float"}
+    assert json.loads(cli.process_command("select typed where age > 10"))[0]["age"] == 12
+
+
+def test_script_prints_one_result_per_statement(cli, tmp_path):
+    script = tmp_path / "load.sql"
+    script.write_text(
+        "-- setup\n"
+        "make people;\n"
+        'include people [{"name": "a;b", "age": 1}];\n'
+        "bogus;\n"
+        "select people\n  where id = 1;\n"
+        "count people"
+    )
+    out = io.StringIO()
+    with open(script) as f:
+        assert cli.run_script(f, out=out) == 5
+
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [line["statement"] for line in lines] == [
+        "make people",
+        'include people [{"name": "a;b", "age": 1}]',
+        "bogus",
+        "select people   where id = 1",
+        "count people",
+    ]
+    assert lines[2]["result"] == "Invalid command."
+    assert lines[3]["result"] == [{"name": "a;b", "age": 1, "id": 1}]
+    assert lines[4]["result"] == "Table 'people' contains 1 record(s)."
+    assert cli._txn is None
+    assert "people" in json.loads((tmp_path / "t.json").read_text())  # Committed at the end
@@ -0,0 +1,76 @@
+from db import FlatDB
+
+
+def open_log(tmp_path):
+    return FlatDB(str(tmp_path / "storage.json"), log=True)
+
+
+def ids(db, table="t"):
+    return [row["id"] for row in db.get_all(table)]
+
+
+def test_unterminated_last_line_is_dropped(tmp_path):
+    db = open_log(tmp_path)
+    db.insert("t", {"n": 1})
+    db.close()
+    log = tmp_path / "storage.json.log"
+    log.write_bytes(log.read_bytes().rstrip(b"\n"))  # Crash before the newline reached the disk
+
+    db = open_log(tmp_path)
+    for n in (2, 3, 4):
+        db.insert("t", {"n": n})
+    db.close()
+
+    db = open_log(tmp_path)
+    assert [row["n"] for row in db.get_all("t")] == [2, 3, 4]
+    db.close()
+
+
+def test_crash_before_snapshot_replays_log(tmp_path):
+    db = open_log(tmp_path)
+    db.insert_many("t", [{"n": n} for n in range(3)])
+
+    def crash(*args, **kwargs):
+        raise OSError("crash")  # Before the new snapshot replaces the old one
+    db._write_file = crash
+    try:
+        db.compact()
+    except OSError:
+        pass
+
+    db = open_log(tmp_path)
+    assert ids(db) == [1, 2, 3]
+    db.close()
+
+
+def test_crash_after_snapshot_skips_compacted_log(tmp_path):
+    db = open_log(tmp_path)
+    db.insert_many("t", [{"n": n} for n in range(3)])
+    db.delete("t", 0)
+    db.vacuum("t")
+    db.update("t", 0, {"n": 10})
+
+    write_file = db._write_file
+
+    def crash(*args, **kwargs):
+        write_file(*args, **kwargs)
+        raise OSError("crash")  # The new snapshot is in place, the old log is not yet restarted
+    db._write_file = crash
+    try:
+        db.compact()
+    except OSError:
+        pass
+
+    db = open_log(tmp_path)
+    assert [(row["id"], row["n"]) for row in db.get_all("t")] == [(2, 10), (3, 2)]
+    db.insert("t", {"n": 4})
+    db.close()
+
+    db = open_log(tmp_path)
+    assert ids(db) == [2, 3, 4]
+    db.compact()
+    db.close()
+
+    db = open_log(tmp_path)
+    assert ids(db) == [2, 3, 4]
+    db.close()
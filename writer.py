@@ -0,0 +1,72 @@
+import asyncio
+
+from fastapi.concurrency import run_in_threadpool
+
+
+class GroupCommitWriter:
+    """Single writer task that applies queued FlatDB mutations in batches.
+
+    Every mutation waiting in the queue when the writer wakes up is applied
+    inside one `FlatDB.batch()`, so the whole group shares a single flush
+    (or log sync). Each caller is answered only after that flush.
+    """
+
+    def __init__(self, db, max_batch=256):
+        self.db = db
+        self.max_batch = max_batch
+        self._queue = None
+        self._task = None
+        self._loop = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, fn, *args):
+        """Queue `fn(*args)` (a FlatDB mutation) and wait for it to be durable."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((fn, args, future))
+        return await future
+
+    def _apply(self, batch):
+        results = []
+        with self.db.batch():
+            for fn, args, _ in batch:
+                try:
+                    results.append((True, fn(*args)))
+                except Exception as e:
+                    results.append((False, e))
+        return results
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await run_in_threadpool(self._apply, batch)
+            except Exception as e:
+                # The flush itself failed: nobody in the group is durable
+                results = [(False, e)] * len(batch)
+            for (_, _, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def stop(self):
+        """Let queued mutations finish, then stop the writer task."""
+        if self._task is None or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.join()
+        self._task.cancel()
+        self._task = None
+        self._loop = None